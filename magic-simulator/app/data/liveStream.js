@@ -0,0 +1,30 @@
+// Client for magic_cube_module/live_server.py.
+// Every message carries the cube after its last step; "batch" messages also list
+// the individual swaps, "snapshot" messages are sent instead when the client fell
+// behind and intermediate swaps were coalesced away.
+
+const LIVE_URL = "http://127.0.0.1:8765";
+
+export async function startLiveRun(algorithm, params = {}, baseUrl = LIVE_URL) {
+  const response = await fetch(`${baseUrl}/runs`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ algorithm, params }),
+  });
+  const { run_id } = await response.json();
+  return run_id;
+}
+
+// onUpdate receives { type, start, steps: [[index1, index2, cost, accepted], ...], cost, cube }.
+// Returns a function that closes the stream.
+export function subscribeToRun(runId, onUpdate, baseUrl = LIVE_URL) {
+  const source = new EventSource(`${baseUrl}/runs/${runId}/events`);
+  const handle = (event) => onUpdate(JSON.parse(event.data));
+  source.addEventListener("batch", handle);
+  source.addEventListener("snapshot", handle);
+  source.addEventListener("done", (event) => {
+    handle(event);
+    source.close();
+  });
+  return () => source.close();
+}
@@ -0,0 +1,137 @@
+// Lazy loader for the binary trajectories written by magic_cube_module/export.py.
+// Each chunk holds little-endian column blocks, in this order:
+// int16 index1[count], int16 index2[count], float32 cost[count],
+// int32 lineSums[count][numLines], int16 keyframes[keyframes][size^3], uint8 applied[count].
+// keyframes[j] is the cube before step chunk.start + j * keyframe_interval.
+// run.segments lists the restarts of a run as { start, cube }: the cube before
+// step `start`, which does not follow from the swaps before it.
+
+// Must match EXPORT_VERSION in magic_cube_module/export.py
+const EXPORT_VERSION = 4;
+const BASE_URL = "/trajectories";
+
+export async function loadManifest(baseUrl = BASE_URL) {
+  const response = await fetch(`${baseUrl}/manifest.json`);
+  const manifest = await response.json();
+  if (manifest.version !== EXPORT_VERSION) {
+    throw new Error(`Unsupported trajectory export version ${manifest.version}`);
+  }
+  return manifest;
+}
+
+export function parseChunk(buffer, chunk, run) {
+  const count = chunk.count;
+  const cells = run.size ** 3;
+  let offset = 0;
+  const take = (ArrayType, length) => {
+    const view = new ArrayType(buffer, offset, length);
+    offset += length * ArrayType.BYTES_PER_ELEMENT;
+    return view;
+  };
+  return {
+    index1: take(Int16Array, count),
+    index2: take(Int16Array, count),
+    cost: take(Float32Array, count),
+    lineSums: take(Int32Array, count * run.num_lines),
+    keyframes: take(Int16Array, chunk.keyframes * cells),
+    applied: take(Uint8Array, count),
+  };
+}
+
+export class TrajectoryPlayer {
+  constructor(run, baseUrl = BASE_URL) {
+    this.run = run;
+    this.baseUrl = baseUrl;
+    this.numSteps = run.num_steps;
+    this.cells = run.size ** 3;
+    this.chunks = new Map(); // chunk number -> Promise of parsed chunk
+  }
+
+  loadChunk(chunkNumber) {
+    if (!this.chunks.has(chunkNumber)) {
+      const chunk = this.run.chunks[chunkNumber];
+      const promise = fetch(`${this.baseUrl}/${this.run.path}/${chunk.file}`)
+        .then((response) => response.arrayBuffer())
+        .then((buffer) => parseChunk(buffer, chunk, this.run));
+      this.chunks.set(chunkNumber, promise);
+    }
+    return this.chunks.get(chunkNumber);
+  }
+
+  // Fetch the chunk holding step k and prefetch the next one so playback
+  // does not stall at chunk borders.
+  async locate(k) {
+    const chunkNumber = Math.floor(k / this.run.chunk_size);
+    if (chunkNumber + 1 < this.run.chunks.length) {
+      this.loadChunk(chunkNumber + 1);
+    }
+    const data = await this.loadChunk(chunkNumber);
+    return { data, offset: k - this.run.chunks[chunkNumber].start };
+  }
+
+  // Returns { index1, index2, cost, applied } of step k
+  async getStep(k) {
+    const { data, offset } = await this.locate(k);
+    return {
+      index1: data.index1[offset],
+      index2: data.index2[offset],
+      cost: data.cost[offset],
+      applied: data.applied[offset] === 1,
+    };
+  }
+
+  // Last restart segment starting at or before step k, if any
+  segmentBefore(k) {
+    let found = null;
+    for (const segment of this.run.segments || []) {
+      if (segment.start <= k) {
+        found = segment;
+      }
+    }
+    return found;
+  }
+
+  // Cube after step k: copy the nearest keyframe, or the start cube of a
+  // restart beginning after it, and apply at most keyframe_interval swaps.
+  async getCube(k) {
+    const { data, offset } = await this.locate(k);
+    const chunkStart = k - offset;
+    const keyframe = Math.floor(offset / this.run.keyframe_interval);
+    let first = keyframe * this.run.keyframe_interval;
+    let cube = data.keyframes.slice(
+      keyframe * this.cells,
+      (keyframe + 1) * this.cells
+    );
+    const segment = this.segmentBefore(k);
+    if (segment && segment.start > chunkStart + first) {
+      cube = Int16Array.from(segment.cube);
+      first = segment.start - chunkStart;
+    }
+    for (let i = first; i <= offset; i++) {
+      if (data.applied[i]) {
+        const a = data.index1[i];
+        const b = data.index2[i];
+        [cube[a], cube[b]] = [cube[b], cube[a]];
+      }
+    }
+    return cube;
+  }
+
+  // Precomputed sum of every line after step k, in the order of
+  // magic_cube_module/lines.py line_table
+  async getLineSums(k) {
+    const { data, offset } = await this.locate(k);
+    const numLines = this.run.num_lines;
+    return data.lineSums.subarray(offset * numLines, (offset + 1) * numLines);
+  }
+
+  // Drop cached chunks far from the current position to bound memory
+  evictAround(k, keep = 2) {
+    const current = Math.floor(k / this.run.chunk_size);
+    for (const chunkNumber of this.chunks.keys()) {
+      if (Math.abs(chunkNumber - current) > keep) {
+        this.chunks.delete(chunkNumber);
+      }
+    }
+  }
+}
@@ -1,40 +1,35 @@
-import random
 import numpy as np
 import time
+import heapq
+
+from magic_cube import MagicCube
+from lines import line_table
+from operator_scheduler import make_scheduler
+from random_streams import make_rng
+from algorithms.stochastichc import first_improvement_search
+from seeding import initial_cube
+from endgame import run_endgame
 
 # Genetic Algorithm Parameters
 POPULATION_SIZE = 100
 MUTATION_RATE = 0.1
-CUBE_SIZE = 5
 MAX_GENERATIONS = 1000
 
-# Assuming MagicCube class is available and has a calculate_cost method
-class MagicCube:
-    def __init__(self, cube_data=None, size=5):
-        self.size = size
-        if cube_data is not None:
-            self.cube = np.array(cube_data).reshape((size, size, size))
-        else:
-            numbers = list(range(1, size**3 + 1))
-            np.random.shuffle(numbers)
-            self.cube = np.array(numbers).reshape((size, size, size))
-    
-    def calculate_cost(self):
-        # Placeholder for actual cost calculation method
-        return np.sum(self.cube)  # Replace with actual calculation logic
-
 # Initializing a random individual as a MagicCube instance
-def create_individual():
-    return MagicCube(cube_data=np.random.permutation(range(1, CUBE_SIZE**3 + 1)))
+def create_individual(rng, strategy='random', size=5):
+    return MagicCube(cube_data=initial_cube(strategy, size, rng), size=size)
 
 # Fitness function
 def fitness(individual):
-    return -individual.calculate_cost()
+    # Baldwinian memetic runs rank individuals by the cost they reach after local search
+    learned_cost = getattr(individual, 'learned_cost', None)
+    return -(learned_cost if learned_cost is not None else individual.calculate_cost())
 
 # Ordered crossover function
-def ordered_crossover(parent1, parent2):
-    size = CUBE_SIZE**3  # Total number of elements in the cube
-    start, end = sorted(random.sample(range(size), 2))  # Random crossover points
+def ordered_crossover(parent1, parent2, rng):
+    cube_size = parent1.size
+    size = cube_size**3  # Total number of elements in the cube
+    start, end = sorted(rng.choice(size, 2, replace=False).tolist())  # Random crossover points
 
     # Flatten cubes for crossover, keeping track of unique elements
     parent1_flat, parent2_flat = parent1.cube.flatten(), parent2.cube.flatten()
@@ -57,68 +52,349 @@ def ordered_crossover(parent1, parent2):
     child2 = fill_child(child2, parent1_flat)
 
     # Return children as new MagicCube instances
-    return MagicCube(cube_data=child1), MagicCube(cube_data=child2)
+    return MagicCube(cube_data=child1, size=cube_size), MagicCube(cube_data=child2, size=cube_size)
+
+# Swap mutation with duplicate prevention and correction
+def swap_mutation(individual, rng):
+    cube_size = individual.size
+    size = cube_size**3
+    flat_individual = individual.cube.flatten()
+
+    idx1, idx2 = rng.choice(size, 2, replace=False).tolist()
+    flat_individual[idx1], flat_individual[idx2] = flat_individual[idx2], flat_individual[idx1]
+
+    unique_values = set(flat_individual)
+    full_range = set(range(1, size + 1))
+    missing_values = full_range - unique_values
+
+    while len(unique_values) < size:
+        for i in range(size):
+            if list(flat_individual).count(flat_individual[i]) > 1:
+                flat_individual[i] = missing_values.pop()
+                unique_values = set(flat_individual)
 
-# Mutation function with duplicate prevention and correction
-def mutate(individual):
-    if random.random() < MUTATION_RATE:
-        size = CUBE_SIZE**3
-        flat_individual = individual.cube.flatten()
+    individual.cube = flat_individual.reshape((cube_size, cube_size, cube_size))
 
-        idx1, idx2 = random.sample(range(size), 2)
-        flat_individual[idx1], flat_individual[idx2] = flat_individual[idx2], flat_individual[idx1]
+# Swap two cells of one random line
+def line_swap_mutation(individual, rng):
+    lines = line_table(individual.size)
+    idx1, idx2 = rng.choice(lines[rng.integers(len(lines))], 2, replace=False).tolist()
+    flat_individual = individual.cube.flatten()
+    flat_individual[idx1], flat_individual[idx2] = flat_individual[idx2], flat_individual[idx1]
+    individual.cube = flat_individual.reshape(individual.cube.shape)
 
-        unique_values = set(flat_individual)
-        full_range = set(range(1, CUBE_SIZE**3 + 1))
-        missing_values = full_range - unique_values
+# Shuffle the values of a few random cells (3 to 5)
+def scramble_mutation(individual, rng):
+    cells = rng.choice(individual.size**3, rng.integers(3, 6), replace=False)
+    flat_individual = individual.cube.flatten()
+    flat_individual[cells] = rng.permutation(flat_individual[cells])
+    individual.cube = flat_individual.reshape(individual.cube.shape)
 
-        while len(unique_values) < size:
-            for i in range(size):
-                if list(flat_individual).count(flat_individual[i]) > 1:
-                    flat_individual[i] = missing_values.pop()
-                    unique_values = set(flat_individual)
+# Mutation operators, the arms of a mutation scheduler
+MUTATION_OPERATORS = {
+    'swap': swap_mutation,
+    'line_swap': line_swap_mutation,
+    'scramble': scramble_mutation
+}
 
-        individual.cube = flat_individual.reshape((CUBE_SIZE, CUBE_SIZE, CUBE_SIZE))
+# Mutation function; with a scheduler (see operator_scheduler) the operator of every mutation is
+# chosen by the bandit, rewarded when the mutation lowered the individual's cost
+def mutate(individual, rng, operator='swap', scheduler=None):
+    if rng.random() < MUTATION_RATE:
+        if scheduler is not None:
+            operator = scheduler.select()
+            cost_before = individual.calculate_cost()
+        MUTATION_OPERATORS[operator](individual, rng)
+        if scheduler is not None:
+            scheduler.update(operator, individual.calculate_cost() < cost_before)
     return individual
 
-def genetic_algorithm(population_size, max_iterations, mutation_rate, elitism):
+# Memetic refinement: bounded local search on individuals within a per-generation evaluation budget.
+# Lamarckian refinement writes the improved cube back into the individual, Baldwinian refinement only
+# keeps the improved cost (and cube, for reporting) while the genotype stays unchanged
+def refine(individuals, rng, evaluations_per_individual, evaluation_budget=None, lamarckian=True, objective='l1'):
+    remaining = evaluation_budget if evaluation_budget is not None else evaluations_per_individual * len(individuals)
+    for individual in individuals:
+        if remaining <= 0:
+            break
+        learner = individual if lamarckian else MagicCube(cube_data=individual.cube.copy(), size=individual.size)
+        remaining -= first_improvement_search(learner, min(evaluations_per_individual, remaining), rng, objective)
+        if not lamarckian:
+            individual.learned_cost = learner.calculate_cost()
+            individual.learned_cube = learner.cube
+    return individuals
+
+# Cube and cost to report for an individual (the learned phenotype of Baldwinian individuals)
+def phenotype(individual):
+    return getattr(individual, 'learned_cube', individual.cube), -fitness(individual)
+
+# Checkpoint form of an individual: its cube plus the learned phenotype of Baldwinian individuals
+def individual_state(individual):
+    return {
+        "cube": individual.cube,
+        "learned_cost": getattr(individual, 'learned_cost', None),
+        "learned_cube": getattr(individual, 'learned_cube', None)
+    }
+
+def restore_individual(state, size):
+    individual = MagicCube(cube_data=state["cube"], size=size)
+    if state["learned_cost"] is not None:
+        individual.learned_cost = state["learned_cost"]
+        individual.learned_cube = state["learned_cube"]
+    return individual
+
+def final_solution(individual, size, endgame=None):
+    # Phenotype of the best individual, completed by the exact endgame solver when it is close to magic
+    final_cube, final_cost = phenotype(individual)
+    if endgame:
+        cube = MagicCube(cube_data=final_cube.copy(), size=size)
+        outcome = run_endgame(cube, endgame)
+        if outcome['solved']:
+            return cube.cube, outcome['cost']
+    return final_cube, final_cost
+
+def publish(shared_population, population, costs):
+    # Mirror the population and its costs into a shared_state.SharedPopulation for other processes
+    for index, (individual, cost) in enumerate(zip(population, costs)):
+        shared_population.write(index, individual.cube, cost)
+
+def shared_start(shared_population, population_size, size):
+    # Population to continue from: the individuals of a shared population an earlier run filled, else None
+    if shared_population is None:
+        return None
+    if len(shared_population.costs.array) != population_size:
+        raise ValueError(f"Shared population holds {len(shared_population.costs.array)} individuals, expected {population_size}")
+    if not np.isfinite(shared_population.costs.array).all():
+        return None
+    return [MagicCube(cube_data=shared_population.cube(index).copy(), size=size) for index in range(population_size)]
+
+# k-tournament selection over a fitness vector: the best of k random individuals
+def tournament_select(costs, tournament_size, rng):
+    contestants = rng.integers(0, len(costs), tournament_size).tolist()
+    return min(contestants, key=costs.__getitem__)
+
+def genetic_algorithm(population_size, max_iterations, mutation_rate, elitism, recorder=None, checkpoint=None, seed=None, init_strategy='random', size=5,
+                      mode='generational', tournament_size=3, memetic=None, mutation_scheduler=None, endgame=None,
+                      shared_population=None):
+    # memetic: None for a pure GA, or a dict of refine() options applied to the offspring:
+    # evaluations_per_individual, evaluation_budget (per generation), lamarckian, objective and
+    # top_fraction (only refine the best fraction of the offspring)
+    # mutation_scheduler: None for plain swap mutations, or 'ucb' / 'thompson' / an OperatorScheduler
+    # choosing among MUTATION_OPERATORS
+    # endgame: None, True or a dict of endgame options, to close the last violated lines of the final cube exactly
+    # shared_population: optional shared_state.SharedPopulation the population and its costs are mirrored into,
+    # so other processes can follow the run through NumPy views; when an earlier run already filled it,
+    # the run continues from that population instead of seeding a new one
+    if mode == 'steady_state':
+        return steady_state_genetic_algorithm(population_size, max_iterations, recorder, checkpoint, seed, init_strategy, size, tournament_size,
+                                              memetic, mutation_scheduler, endgame, shared_population)
+
+    # Per-run generator; parallel runs get independent streams through random_streams.spawn_seeds
+    rng = make_rng(seed)
+    scheduler = make_scheduler(mutation_scheduler, MUTATION_OPERATORS, rng)
     results = {
-        "initial_cube": create_individual().cube.flatten().tolist(),
+        "initial_cube": create_individual(rng, size=size).cube.flatten().tolist(),
         "final_cube": None,
         "final_cost": None,
-        "objective_per_iteration": [],
+        # (max, avg) objective per generation, optionally streamed through a TrajectoryRecorder
+        "objective_per_iteration": recorder if recorder is not None else [],
         "population_size": population_size,
         "iterations": max_iterations,
+        "mode": mode,
+        "memetic": memetic,
         "duration": None
     }
 
     start_time = time.time()
-    population = [create_individual() for _ in range(population_size)]
+    # The initial population comes from the seeding strategy (e.g. 'constructive' or 'greedy')
+    population = [create_individual(rng, init_strategy, size) for _ in range(population_size)]
+    population = shared_start(shared_population, population_size, size) or population
+    start_generation = 0
 
-    for generation in range(max_iterations):
+    # Elites and parent pool are the top 10% and 50% (10 and 50 of a population of 100),
+    # so small populations don't carry every individual over unchanged
+    num_elites = max(1, population_size // 10)
+    num_parents = max(2, population_size // 2)
+
+    # Continue from the last checkpoint, including the generator state, when resuming
+    state = checkpoint.restore() if checkpoint is not None else None
+    if state is not None:
+        population = [restore_individual(individual, size) for individual in state["population"]]
+        results = {**state["results"], "objective_per_iteration": results["objective_per_iteration"]}
+        rng.bit_generator.state = state["rng_state"]
+        start_generation = state["generation"]
+        start_time -= state["elapsed"]
+        scheduler = state.get("scheduler", scheduler)
+        if scheduler is not None:
+            # The pickled scheduler holds its own copy of the generator, share the restored one again
+            scheduler.rng = rng
+    if checkpoint is not None:
+        # The objective series is logged incrementally instead of being pickled with every save
+        results["objective_per_iteration"] = checkpoint.track("objectives", results["objective_per_iteration"])
+
+    for generation in range(start_generation, max_iterations):
         population = sorted(population, key=fitness, reverse=True)
 
         max_obj = fitness(population[0])
         avg_obj = sum(fitness(ind) for ind in population) / population_size
         results["objective_per_iteration"].append((max_obj, avg_obj))
+        if shared_population is not None:
+            publish(shared_population, population, [-fitness(individual) for individual in population])
 
-        new_population = population[:10] if elitism else []
+        new_population = population[:num_elites] if elitism else []
+        num_carried = len(new_population)
 
         while len(new_population) < population_size:
-            parent1, parent2 = random.sample(population[:50], 2)
-            offspring1, offspring2 = ordered_crossover(parent1, parent2)
-            offspring1 = mutate(offspring1)
-            offspring2 = mutate(offspring2)
+            parents = population[:num_parents]
+            index1, index2 = rng.choice(len(parents), 2, replace=False).tolist()
+            offspring1, offspring2 = ordered_crossover(parents[index1], parents[index2], rng)
+            offspring1 = mutate(offspring1, rng, scheduler=scheduler)
+            offspring2 = mutate(offspring2, rng, scheduler=scheduler)
             new_population.extend([offspring1, offspring2])
 
         population = new_population[:population_size]
 
+        if memetic is not None:
+            offspring = population[num_carried:]
+            top_fraction = memetic.get('top_fraction', 1.0)
+            if top_fraction < 1.0:
+                offspring = sorted(offspring, key=fitness, reverse=True)[:max(1, int(len(offspring) * top_fraction))]
+            refine(offspring, rng, memetic.get('evaluations_per_individual', 200), memetic.get('evaluation_budget'),
+                   memetic.get('lamarckian', True), memetic.get('objective', 'l1'))
+            # Refined offspring may now beat the elites
+            population = sorted(population, key=fitness, reverse=True)
+
         if fitness(population[0]) == 0:
             break
 
+        if checkpoint is not None and checkpoint.due(generation + 1):
+            checkpoint.save({
+                "generation": generation + 1,
+                "population": [individual_state(individual) for individual in population],
+                "results": {key: value for key, value in results.items() if key != "objective_per_iteration"},
+                "rng_state": rng.bit_generator.state,
+                "scheduler": scheduler,
+                "elapsed": time.time() - start_time
+            })
+
+    if checkpoint is not None:
+        checkpoint.clear()
+        results["objective_per_iteration"] = results["objective_per_iteration"].sink
+
     end_time = time.time()
-    results["final_cube"] = population[0].cube.flatten().tolist()
-    results["final_cost"] = -fitness(population[0])
+    if scheduler is not None:
+        results["mutation_operators"] = scheduler.stats()
+    final_cube, final_cost = final_solution(population[0], size, endgame)
+    results["final_cube"] = final_cube.flatten().tolist()
+    results["final_cost"] = final_cost
     results["duration"] = end_time - start_time
 
     return results
+
+def steady_state_genetic_algorithm(population_size, max_iterations, recorder=None, checkpoint=None, seed=None, init_strategy='random', size=5,
+                                   tournament_size=3, memetic=None, mutation_scheduler=None, endgame=None,
+                                   shared_population=None):
+    """
+    Steady-state GA: every iteration breeds two children from k-tournament parents and inserts
+    each one in place of the current worst individual if it is better.
+
+    Costs are evaluated once per individual and kept in a fitness vector next to a max-heap of
+    (cost, index), so selection is O(k) and replace-worst is O(log P) instead of re-sorting the
+    population every generation. Returns the same results dict as genetic_algorithm, with one
+    (max, avg) objective entry per iteration.
+    """
+    rng = make_rng(seed)
+    scheduler = make_scheduler(mutation_scheduler, MUTATION_OPERATORS, rng)
+    results = {
+        "initial_cube": create_individual(rng, size=size).cube.flatten().tolist(),
+        "final_cube": None,
+        "final_cost": None,
+        "objective_per_iteration": recorder if recorder is not None else [],
+        "population_size": population_size,
+        "iterations": max_iterations,
+        "mode": "steady_state",
+        "memetic": memetic,
+        "duration": None
+    }
+
+    start_time = time.time()
+    population = [create_individual(rng, init_strategy, size) for _ in range(population_size)]
+    population = shared_start(shared_population, population_size, size) or population
+    start_iteration = 0
+
+    state = checkpoint.restore() if checkpoint is not None else None
+    if state is not None:
+        population = [restore_individual(individual, size) for individual in state["population"]]
+        results = {**state["results"], "objective_per_iteration": results["objective_per_iteration"]}
+        rng.bit_generator.state = state["rng_state"]
+        start_iteration = state["iteration"]
+        start_time -= state["elapsed"]
+        scheduler = state.get("scheduler", scheduler)
+        if scheduler is not None:
+            # The pickled scheduler holds its own copy of the generator, share the restored one again
+            scheduler.rng = rng
+    if checkpoint is not None:
+        # The objective series is logged incrementally instead of being pickled with every save
+        results["objective_per_iteration"] = checkpoint.track("objectives", results["objective_per_iteration"])
+
+    costs = [-fitness(individual) for individual in population]
+    # The running total is restored as saved, so the average matches an uninterrupted run exactly
+    total_cost = state["total_cost"] if state is not None else sum(costs)
+    best_index = min(range(population_size), key=costs.__getitem__)
+    # Max-heap of the population by cost (negated for heapq); the root is the worst individual
+    worst_heap = [(-cost, index) for index, cost in enumerate(costs)]
+    heapq.heapify(worst_heap)
+    if shared_population is not None:
+        publish(shared_population, population, costs)
+
+    for iteration in range(start_iteration, max_iterations):
+        parent1 = population[tournament_select(costs, tournament_size, rng)]
+        parent2 = population[tournament_select(costs, tournament_size, rng)]
+        children = [mutate(child, rng, scheduler=scheduler) for child in ordered_crossover(parent1, parent2, rng)]
+        if memetic is not None:
+            refine(children, rng, memetic.get('evaluations_per_individual', 200), memetic.get('evaluation_budget'),
+                   memetic.get('lamarckian', True), memetic.get('objective', 'l1'))
+        for child in children:
+            child_cost = -fitness(child)
+            worst_cost, worst_index = -worst_heap[0][0], worst_heap[0][1]
+            if child_cost >= worst_cost:
+                continue
+
+            # Replace the worst individual with the child
+            heapq.heapreplace(worst_heap, (-child_cost, worst_index))
+            population[worst_index] = child
+            total_cost += child_cost - worst_cost
+            costs[worst_index] = child_cost
+            if shared_population is not None:
+                shared_population.write(worst_index, child.cube, child_cost)
+            if child_cost < costs[best_index]:
+                best_index = worst_index
+
+        results["objective_per_iteration"].append((-costs[best_index], -total_cost / population_size))
+
+        if costs[best_index] == 0:
+            break
+
+        if checkpoint is not None and checkpoint.due(iteration + 1):
+            checkpoint.save({
+                "iteration": iteration + 1,
+                "population": [individual_state(individual) for individual in population],
+                "total_cost": total_cost,
+                "results": {key: value for key, value in results.items() if key != "objective_per_iteration"},
+                "rng_state": rng.bit_generator.state,
+                "scheduler": scheduler,
+                "elapsed": time.time() - start_time
+            })
+
+    if checkpoint is not None:
+        checkpoint.clear()
+        results["objective_per_iteration"] = results["objective_per_iteration"].sink
+
+    if scheduler is not None:
+        results["mutation_operators"] = scheduler.stats()
+    final_cube, final_cost = final_solution(population[best_index], size, endgame)
+    results["final_cube"] = final_cube.flatten().tolist()
+    results["final_cost"] = final_cost
+    results["duration"] = time.time() - start_time
+
+    return results
@@ -1,73 +1,136 @@
 import numpy as np
-import random
-import itertools
 import matplotlib.pyplot as plt  # Import library for plotting
 
-def random_restart_hill_climbing(cube, max_restarts, max_iterations_per_restart=50):
+from neighborhoods import neighborhood
+from random_streams import make_rng
+from seeding import initial_cube
+from endgame import run_endgame
+
+def hill_climb(cube, max_iterations, rng=None, neighborhood_type='auto', sample_size=None, steps=None):
+    """
+    Steepest-ascent core shared by every restart: applies the best improving swap until no
+    neighbor is better, the cost is 0 or max_iterations is reached. Large cubes evaluate a
+    bounded neighborhood per iteration (see neighborhoods.neighborhood).
+    Steps are appended to `steps` (a list or a recorder) as they are taken.
+    Returns the final cost, the steps and the number of iterations.
+    """
+    rng = rng if rng is not None else make_rng()
+    current_cost = cube.calculate_cost()
+    steps = steps if steps is not None else []
+    iteration = 0
+
+    while current_cost > 0 and iteration < max_iterations:
+        print(f"Iteration {iteration}: {current_cost} cost")
+
+        best_cube = cube.cube.copy()
+        best_cost = current_cost
+        best_swap = None
+
+        for pos1, pos2 in neighborhood(neighborhood_type, cube, rng, sample_size):
+            # Score the candidate in place and swap it back, so every candidate is a single swap
+            # away from the current cube
+            cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
+            new_cost = cube.calculate_cost()
+            if new_cost < best_cost:
+                best_cost = new_cost
+                best_cube = cube.cube.copy()
+                best_swap = (pos1, pos2)
+            cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
+
+        if best_cost == current_cost:
+            print("No better neighbors found, stopping hill-climbing.")
+            steps.append({
+                'index1': 0,
+                'index2': 0,
+                'cost': current_cost
+            })
+            break
+
+        if best_swap:
+            pos1, pos2 = best_swap
+            steps.append({
+                'index1': np.ravel_multi_index(pos1, cube.cube.shape),
+                'index2': np.ravel_multi_index(pos2, cube.cube.shape),
+                'cost': best_cost
+            })
+
+        cube.cube = best_cube
+        current_cost = best_cost
+        iteration += 1
+
+    return current_cost, steps, iteration
+
+def random_restart_hill_climbing(cube, max_restarts, max_iterations_per_restart=50, recorder=None, seed=None,
+                                 restart_strategy='random', mode='restart', perturbation='swaps',
+                                 perturbation_strength=None, max_perturbation_strength=None,
+                                 neighborhood_type='auto', sample_size=None, endgame=None, segments=None):
+    """
+    mode='restart' starts every restart from a new cube drawn with restart_strategy.
+    mode='ils' (iterated local search) instead perturbs the incumbent local optimum, with
+    perturbation='swaps' (k random swaps) or 'kick' (k swaps out of the worst lines), and
+    re-optimizes it. k starts at perturbation_strength and doubles, up to
+    max_perturbation_strength, each time the search falls back into an optimum it already visited.
+    With endgame set, every local optimum close to magic is handed to the exact endgame solver.
+    The steps of every restart are streamed to recorder (or the returned list) as they are taken,
+    so the trajectory holds all restarts one after another. When segments is a list, the first
+    step and the start cube of every restart are appended to it.
+    Returns the best cost and cube, the number of steps of the restart that found them, the steps
+    of all restarts and the iterations of every restart.
+    """
+    rng = make_rng(seed)
     best_overall_cost = float('inf')
     best_overall_cube = cube.cube.copy()
     iterations_per_restart = []  # New array to track iterations for each restart
-    best_steps = []  # Modified to store steps with index1, index2, cost format
-    
+    best_restart_steps = 0  # Steps taken by the restart that found the best cube
+    steps = recorder if recorder is not None else []  # Steps of all restarts (optionally streamed to disk)
+
+    # Iterated local search state
+    base_strength = perturbation_strength if perturbation_strength is not None else max(2, cube.size**3 // 50)
+    max_strength = max_perturbation_strength if max_perturbation_strength is not None else max(base_strength, cube.size**3 // 4)
+    strength = base_strength
+    incumbent_cube = cube.cube.copy()
+    visited_optima = set()
+
     for restart in range(max_restarts):
         print(f"Restart {restart+1}/{max_restarts}")
 
         if restart > 0:
-            numbers = list(range(1, cube.size**3 + 1))
-            np.random.shuffle(numbers)
-            cube.cube = np.array(numbers).reshape((cube.size, cube.size, cube.size))
-
-        current_cost = cube.calculate_cost()
-        steps = []  # Track steps for current restart
-        iteration = 0
-
-        while current_cost > 0 and iteration < max_iterations_per_restart:
-            print(f"Iteration {iteration}: {current_cost} cost")
-
-            best_cube = cube.cube.copy()
-            best_cost = current_cost
-            best_swap = None
-
-            for pos1, pos2 in itertools.combinations(np.ndindex(cube.cube.shape), 2):
-                new_cube = cube.cube.copy()
-                new_cube[pos1], new_cube[pos2] = new_cube[pos2], new_cube[pos1]
-                cube.cube = new_cube
-                new_cost = cube.calculate_cost()
-
-                if new_cost < best_cost:
-                    best_cost = new_cost
-                    best_cube = new_cube.copy()
-                    best_swap = (pos1, pos2)
-
-            if best_cost == current_cost:
-                print("No better neighbors found, stopping hill-climbing.")
-                steps.append({
-                    'index1': 0,
-                    'index2': 0,
-                    'cost': current_cost
-                })
-                break
-
-            if best_swap:
-                pos1, pos2 = best_swap
-                steps.append({
-                    'index1': np.ravel_multi_index(pos1, cube.cube.shape),
-                    'index2': np.ravel_multi_index(pos2, cube.cube.shape),
-                    'cost': best_cost
-                })
-
-            cube.cube = best_cube
-            current_cost = best_cost
-            iteration += 1
+            if mode == 'ils':
+                strategy = 'kick' if perturbation == 'kick' else 'perturb'
+                cube.cube = initial_cube(strategy, cube.size, rng, base=incumbent_cube, num_swaps=strength)
+            else:
+                # 'perturb' restarts from a perturbed copy of the best cube so far
+                cube.cube = initial_cube(restart_strategy, cube.size, rng, base=best_overall_cube)
+
+        restart_start = len(steps)
+        if segments is not None:
+            segments.append((restart_start, cube.cube.copy()))
+        current_cost, steps, iteration = hill_climb(cube, max_iterations_per_restart, rng, neighborhood_type, sample_size, steps)
+        if endgame:
+            outcome = run_endgame(cube, endgame, steps)
+            if outcome['solved']:
+                current_cost = outcome['cost']
 
         iterations_per_restart.append(iteration)  # Store iterations for this restart
 
+        if mode == 'ils':
+            # Returning to a known optimum means the kicks are too weak to escape its basin
+            optimum = cube.cube.tobytes()
+            if optimum in visited_optima:
+                strength = min(strength * 2, max_strength)
+            else:
+                strength = base_strength
+                visited_optima.add(optimum)
+            # Accept equal-cost optima as the new incumbent so the search can drift across plateaus
+            if current_cost <= best_overall_cost:
+                incumbent_cube = cube.cube.copy()
+
         if current_cost < best_overall_cost:
             best_overall_cost = current_cost
             best_overall_cube = cube.cube.copy()
-            best_steps = steps  # Store steps from best restart
+            best_restart_steps = len(steps) - restart_start
 
         if current_cost == 0:
             break
 
-    return best_overall_cost, best_overall_cube, len(best_steps), best_steps, iterations_per_restart
\ No newline at end of file
+    return best_overall_cost, best_overall_cube, best_restart_steps, steps, iterations_per_restart
\ No newline at end of file
@@ -2,9 +2,13 @@ import numpy as np
 import itertools
 import matplotlib.pyplot as plt
 from collections import defaultdict
-import random
 
-def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, tabu_list_size=50):
+from random_streams import make_rng
+from operator_scheduler import make_scheduler
+from endgame import run_endgame
+
+def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, tabu_list_size=50, recorder=None, checkpoint=None, seed=None,
+                                    operator_scheduler=None, endgame=None):
     """
     Enhanced version of hill climbing with sideways moves that uses:
     - Tabu list to prevent cycling
@@ -18,12 +22,22 @@ def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, t
     - iteration: The number of iterations performed.
     - cost_progress: List of objective values over iterations.
     - sideways_moves: Total number of sideways moves made.
+
+    If a TrajectoryRecorder is given, steps are written through it instead of a list.
+    If a Checkpointer is given, the state is saved periodically and restored when resuming.
+    With an operator_scheduler ('ucb', 'thompson' or an OperatorScheduler), the order in which
+    within_line, cross_line and random candidates are evaluated is chosen by the bandit from
+    their improvement per evaluation, instead of a uniform shuffle.
+    With endgame (True or a dict of endgame options) a final cube with only a few violated
+    lines is completed by the exact endgame solver.
     """
+    rng = make_rng(seed)
+    scheduler = make_scheduler(operator_scheduler, SWAP_TYPES, rng)
     iteration = 0
     sideways_moves = 0
     current_cost = cube.calculate_cost()
     cost_progress = []
-    steps = []  # Collect step data
+    steps = recorder if recorder is not None else []  # Collect step data (optionally streamed to disk)
 
     # Initialize tabu list to prevent revisiting recent states
     tabu_list = []
@@ -34,6 +48,25 @@ def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, t
     # Temperature-like parameter for accepting worse moves occasionally
     initial_temperature = 10.0
 
+    # Line sums are recomputed from the cube every iteration, so the cube is all we need to restore them
+    state = checkpoint.restore() if checkpoint is not None else None
+    if state is not None:
+        cube.cube = state['cube']
+        iteration = state['iteration']
+        sideways_moves = state['sideways_moves']
+        current_cost = state['current_cost']
+        tabu_list = state['tabu_list']
+        swap_effectiveness.update(state['swap_effectiveness'])
+        rng.bit_generator.state = state['rng_state']
+        scheduler = state.get('scheduler', scheduler)
+        if scheduler is not None:
+            # The pickled scheduler holds its own copy of the generator, share the restored one again
+            scheduler.rng = rng
+    if checkpoint is not None:
+        # Steps and costs are logged incrementally instead of being pickled with every save
+        steps = checkpoint.track('steps', steps)
+        cost_progress = checkpoint.track('cost_progress', cost_progress)
+
     while current_cost > 0 and iteration < max_iterations:
         print(f"Iteration {iteration}: {current_cost} cost, Sideways moves: {sideways_moves}")
         
@@ -44,12 +77,19 @@ def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, t
         problem_areas = identify_problem_areas(line_sums)
         
         # Generate candidate swaps with preference for problematic areas
-        candidate_swaps = generate_intelligent_swaps(problem_areas, cube.size, tabu_list)
+        candidate_swaps = generate_intelligent_swaps(problem_areas, cube.size, tabu_list, rng)
         
         # Track if we found any improvement
         found_improvement = False
         temperature = initial_temperature * (1 - iteration / max_iterations)
 
+        if scheduler is not None:
+            by_type = defaultdict(list)
+            for swap_type, pos1, pos2 in candidate_swaps:
+                by_type[swap_type].append((swap_type, pos1, pos2))
+            candidate_swaps = (candidate for _, candidate in scheduler.order(by_type))
+
+        original_cube = cube.cube
         for swap_type, pos1, pos2 in candidate_swaps:
             if (pos1, pos2) in tabu_list:
                 continue
@@ -62,6 +102,8 @@ def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, t
             
             # Update swap effectiveness statistics
             swap_effectiveness[swap_type]['attempts'] += 1
+            if scheduler is not None:
+                scheduler.update(swap_type, new_cost < current_cost)
             
             # Accept if better or with probability based on temperature
             if new_cost < current_cost:
@@ -83,7 +125,7 @@ def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, t
 
             elif new_cost == current_cost and sideways_moves < max_sideways_moves:
                 acceptance_prob = np.exp(-0.1 / temperature)
-                if random.random() < acceptance_prob:
+                if rng.random() < acceptance_prob:
                     best_cube = new_cube.copy()
                     current_cost = new_cost
                     sideways_moves += 1
@@ -100,7 +142,7 @@ def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, t
                     break
             
             # Restore original cube for next attempt
-            cube.cube = new_cube.copy()
+            cube.cube = original_cube
         
         if not found_improvement and sideways_moves >= max_sideways_moves:
             print("No improvement found and sideways moves exhausted.")
@@ -111,7 +153,28 @@ def hill_climbing_with_sideways_move(cube, max_sideways_moves, max_iterations, t
         
         # Periodically adjust strategy based on effectiveness
         if iteration % 50 == 0:
-            adjust_strategy(swap_effectiveness)
+            adjust_strategy(swap_effectiveness, scheduler)
+
+        if checkpoint is not None and checkpoint.due(iteration):
+            checkpoint.save({
+                'iteration': iteration,
+                'cube': cube.cube.copy(),
+                'sideways_moves': sideways_moves,
+                'current_cost': current_cost,
+                'tabu_list': tabu_list,
+                'swap_effectiveness': dict(swap_effectiveness),
+                'rng_state': rng.bit_generator.state,
+                'scheduler': scheduler
+            })
+
+    if checkpoint is not None:
+        checkpoint.clear()
+        steps, cost_progress = steps.sink, cost_progress.sink
+
+    if endgame:
+        outcome = run_endgame(cube, endgame, steps)
+        if outcome['solved']:
+            current_cost = outcome['cost']
     
     # Return structured data matching the expected output
     return current_cost, cube.cube, iteration, steps
@@ -168,6 +231,9 @@ def calculate_line_sums(cube):
     
     return line_sums
 
+# Move operators of generate_intelligent_swaps, the arms of an operator scheduler
+SWAP_TYPES = ('within_line', 'cross_line', 'random')
+
 def identify_problem_areas(line_sums, top_n=5):
     """Identify areas of the cube that need the most improvement."""
     problems = []
@@ -181,8 +247,8 @@ def identify_problem_areas(line_sums, top_n=5):
     
     return problems
 
-def generate_intelligent_swaps(problem_areas, cube_size, tabu_list):
-    """Generate candidate swaps with focus on problem areas."""
+def generate_intelligent_swaps(problem_areas, cube_size, tabu_list, rng):
+    """Generate candidate swaps with focus on problem areas, drawing randomness from rng in blocks."""
     candidates = []
     
     # Generate different types of swaps
@@ -194,21 +260,23 @@ def generate_intelligent_swaps(problem_areas, cube_size, tabu_list):
                 candidates.append(('within_line', pos1, pos2))
     
     # 2. Cross-line swaps between problematic areas
-    for area1, area2 in itertools.combinations(problem_areas, 2):
-        pos1 = get_representative_position(area1, cube_size)
-        pos2 = get_representative_position(area2, cube_size)
+    area_pairs = list(itertools.combinations(problem_areas, 2))
+    offsets = rng.integers(0, cube_size, (len(area_pairs), 2)).tolist()
+    for (area1, area2), (x1, x2) in zip(area_pairs, offsets):
+        pos1 = get_representative_position(area1, cube_size, x1)
+        pos2 = get_representative_position(area2, cube_size, x2)
         if (pos1, pos2) not in tabu_list:
             candidates.append(('cross_line', pos1, pos2))
     
     # 3. Random swaps (for diversity)
-    for _ in range(max(1, len(candidates) // 4)):
-        pos1 = tuple(random.randrange(cube_size) for _ in range(3))
-        pos2 = tuple(random.randrange(cube_size) for _ in range(3))
+    random_positions = rng.integers(0, cube_size, (max(1, len(candidates) // 4), 2, 3)).tolist()
+    for p1, p2 in random_positions:
+        pos1, pos2 = tuple(p1), tuple(p2)
         if (pos1, pos2) not in tabu_list:
             candidates.append(('random', pos1, pos2))
     
     # Shuffle candidates to avoid getting stuck in patterns
-    random.shuffle(candidates)
+    candidates = [candidates[i] for i in rng.permutation(len(candidates))]
     return candidates
 
 def get_line_positions(area, cube_size):
@@ -231,16 +299,15 @@ def get_line_positions(area, cube_size):
             positions.extend((i, x, cube_size-1-x) for x in range(cube_size))
     return positions
 
-def get_representative_position(area, cube_size):
-    """Get a representative position from an area specification."""
+def get_representative_position(area, cube_size, x):
+    """Get a representative position from an area specification, x is a pre-drawn offset along the line."""
     if isinstance(area[0], str) and area[0] == ':':  # Pillar
-        return (random.randrange(cube_size), area[1], area[2])
+        return (x, area[1], area[2])
     elif isinstance(area[1], str) and area[1] == ':':  # Column
-        return (area[0], random.randrange(cube_size), area[2])
+        return (area[0], x, area[2])
     elif isinstance(area[2], str) and area[2] == ':':  # Row
-        return (area[0], area[1], random.randrange(cube_size))
+        return (area[0], area[1], x)
     elif area[1] == 'diag':  # Diagonal
-        x = random.randrange(cube_size)
         if area[2] == 'main':
             return (area[0], x, x)
         else:  # anti-diagonal
@@ -253,15 +320,21 @@ def update_tabu_list(tabu_list, swap, max_size):
     if len(tabu_list) > max_size:
         tabu_list.pop(0)
 
-def adjust_strategy(swap_effectiveness):
-    """Adjust strategy based on the effectiveness of different swap types."""
+def adjust_strategy(swap_effectiveness, scheduler=None):
+    """
+    Report the effectiveness of the different swap types. The candidate mix itself is adapted
+    by the operator scheduler, when one is used, on every evaluation.
+    """
     for swap_type, stats in swap_effectiveness.items():
         if stats['attempts'] > 0:
             effectiveness = stats['improvements'] / stats['attempts']
             print(f"Swap type {swap_type} effectiveness: {effectiveness:.2%}")
+    if scheduler is not None:
+        for swap_type, stats in scheduler.stats().items():
+            print(f"Scheduler {swap_type}: {stats['pulls']:.0f} evaluations")
 
-def plot_results(cost_progress):
-    """Plot the cost progression with additional statistics."""
+def plot_results(cost_progress, path="sideways_move_cost_progression.png"):
+    """Plot the cost progression with additional statistics and save it to path."""
     plt.figure(figsize=(12, 6))
     plt.plot(cost_progress, label='Cost')
     plt.title("Cost Progression during Improved Hill-Climbing")
@@ -281,4 +354,5 @@ def plot_results(cost_progress):
                 label='Moving Average')
     
     plt.legend()
-    plt.show()
\ No newline at end of file
+    plt.savefig(path)
+    plt.close()
\ No newline at end of file
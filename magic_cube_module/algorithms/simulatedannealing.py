@@ -1,47 +1,203 @@
 import numpy as np
-import random
 import math
 from tqdm import tqdm
 
+from objectives import make_objective, CANONICAL_OBJECTIVE
+from random_streams import make_rng, BlockSampler
+from operator_scheduler import make_scheduler
+from endgame import run_endgame
+from lines import line_table
+
+def draw_multi_swap_positions(sampler):
+    """Positions of a chained multi-swap (2 to 4 cells)."""
+    num_swaps = sampler.integer(2, 5)
+    return [sampler.position() for _ in range(num_swaps)]
+
+def calibrate_temperatures(cube, sampler, initial_temperature, target_acceptance, samples, surrogate=None):
+    """
+    Start and end temperatures from sampled random-swap deltas: with the acceptance rule
+    exp(-d / (T / initial_temperature)), a typical uphill normalized delta d (the median of the
+    samples) is accepted with the two target_acceptance probabilities at those temperatures.
+    The cube is left unchanged.
+    """
+    current = surrogate.value if surrogate is not None else cube.calculate_cost()
+    uphill = []
+    for _ in range(samples):
+        pos1, pos2 = sampler.swap()
+        if surrogate is not None:
+            delta = surrogate.swap_delta(pos1[0] * cube.size**2 + pos1[1] * cube.size + pos1[2],
+                                         pos2[0] * cube.size**2 + pos2[1] * cube.size + pos2[2])
+        else:
+            cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
+            delta = cube.calculate_cost() - current
+            cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
+        if delta > 0:
+            uphill.append(min(delta / max(abs(current), 1), 5.0))
+
+    typical_delta = float(np.median(uphill)) if uphill else 1e-3
+    start_acceptance, end_acceptance = target_acceptance
+    start_temperature = initial_temperature * typical_delta / -math.log(start_acceptance)
+    end_temperature = initial_temperature * typical_delta / -math.log(end_acceptance)
+    return start_temperature, end_temperature
+
+def draw_line_swap_positions(sampler, table):
+    """Two distinct positions on the same randomly drawn line."""
+    cells = table[sampler.integer(0, len(table))]
+    first = sampler.integer(0, len(cells))
+    second = sampler.integer(0, len(cells) - 1)
+    second += second >= first
+    return sampler.coords[cells[first]], sampler.coords[cells[second]]
+
+# Neighbor operators, the arms of an operator scheduler: a swap of two random cells, or of two
+# cells on the same line (which leaves that line's sum unchanged)
+NEIGHBOR_OPERATORS = ('swap', 'line_swap')
+
 def simulated_annealing(cube,
                        initial_temperature=100000,
                        min_temperature=0.9995,
                        max_iterations=1000,
                        stage_iterations=1000,
-                       multi_swap_probability=0.3):
-    
+                       multi_swap_probability=0.3,
+                       recorder=None,
+                       seed=None,
+                       checkpoint=None,
+                       objective=CANONICAL_OBJECTIVE,
+                       exact_interval=100,
+                       operator_scheduler=None,
+                       temperature_schedule='fixed',
+                       target_acceptance=(0.8, 0.01),
+                       calibration_samples=200,
+                       acceptance_window=100,
+                       reheat_after=None,
+                       endgame=None):
+    """
+    temperature_schedule='fixed' keeps the staged geometric cooling from initial_temperature
+    down to min_temperature. 'calibrated' derives the start and end temperatures from sampled
+    deltas and target_acceptance (start, end uphill acceptance probabilities), then every
+    acceptance_window iterations compares the measured uphill acceptance rate with the target
+    for the current progress (log-linear between the two) and cools faster or slower accordingly.
+    After reheat_after iterations without a new best (default max_iterations // 10) the temperature
+    is raised back to half the start temperature. The calibrated schedule runs for max_iterations,
+    with the end temperature as a floor.
+    With endgame (True or a dict of endgame options) the best configuration is passed to the
+    exact endgame solver when only a few lines are still violated; its swaps are not recorded.
+    """
+    # A single explicitly seeded generator makes the whole run replayable from the seed,
+    # swap positions and acceptance uniforms are pre-drawn from it in blocks
+    sampler = BlockSampler(make_rng(seed), cube.size)
+    # With an operator scheduler ('ucb', 'thompson' or an OperatorScheduler) the bandit picks the
+    # neighbor operator of every iteration, instead of multi_swap_probability
+    scheduler = make_scheduler(operator_scheduler, NEIGHBOR_OPERATORS, sampler.rng)
+    line_cells = line_table(cube.size).tolist()  # Cells of every line, for line_swap
     current_temperature = initial_temperature
     current_cost = cube.calculate_cost()
     best_cost = current_cost
     best_configuration = cube.cube.copy()
 
-    steps = []
+    steps = recorder if recorder is not None else []
     temperatures = []
     consecutive_non_improvements = 0
     stuck_in_local_optima = 0  # Counter for tracking stuck points
+    start_iteration = 0
+
+    # Continue from the last checkpoint, including the generator state, when resuming
+    state = checkpoint.restore() if checkpoint is not None else None
+    if state is not None:
+        cube.cube = state['cube']
+        sampler = state['sampler']
+        current_temperature = state['current_temperature']
+        current_cost = state['current_cost']
+        best_cost = state['best_cost']
+        best_value = state['best_value']
+        best_configuration = state['best_configuration']
+        consecutive_non_improvements = state['consecutive_non_improvements']
+        stuck_in_local_optima = state['stuck_in_local_optima']
+        start_iteration = state['iteration']
+        scheduler = state.get('scheduler', scheduler)
+        if scheduler is not None:
+            # The pickled scheduler holds its own copy of the generator, share the restored one again
+            scheduler.rng = sampler.rng
+        calibrated = state.get('calibrated')
+    if checkpoint is not None:
+        # Steps and temperatures are logged incrementally instead of being pickled with every save
+        steps = checkpoint.track('steps', steps)
+        temperatures = checkpoint.track('temperatures', temperatures)
+
+    # With a surrogate objective ('l1', 'l2') the search runs on its O(1) delta and value: current_cost,
+    # the recorded step costs and best_value are surrogate values. Every exact_interval iterations the
+    # incremental line sums are resynchronized and the best configuration is scored on the exact
+    # weighted cost (best_cost), which is also what the run returns
+    surrogate = make_objective(objective, cube) if objective != CANONICAL_OBJECTIVE else None
+    if surrogate is not None:
+        current_cost = surrogate.value
+        if state is None:
+            best_value = current_cost
+    elif state is None:
+        best_value = best_cost
+    best_is_scored = True  # Whether best_cost is the exact cost of best_configuration
+
+    def score_best():
+        # Exact weighted cost of the best configuration, evaluated in place of the current cube
+        current_cube = cube.cube
+        cube.cube = best_configuration
+        exact_cost = cube.calculate_cost()
+        cube.cube = current_cube
+        return exact_cost
+
+    if temperature_schedule == 'calibrated' and state is None:
+        start_temperature, end_temperature = calibrate_temperatures(
+            cube, sampler, initial_temperature, target_acceptance, calibration_samples, surrogate)
+        current_temperature = start_temperature
+        calibrated = {
+            'start_temperature': start_temperature,
+            'end_temperature': end_temperature,
+            # Geometric rate that reaches the end temperature after max_iterations
+            'cooling_rate': (end_temperature / start_temperature) ** (1 / max(max_iterations, 1)),
+            'uphill_proposals': 0,
+            'uphill_accepted': 0,
+            'iterations_since_best': 0,
+            'reheats': 0
+        }
+        print(f"Calibrated temperatures: start {start_temperature:.2f}, end {end_temperature:.4f}")
+    elif state is None:
+        calibrated = None
+    reheat_after = reheat_after if reheat_after is not None else max(max_iterations // 10, 1)
 
     def get_problem_specific_neighbor():
-        pos1 = tuple(random.randint(0, cube.size - 1) for _ in range(3))
-        pos2 = tuple(random.randint(0, cube.size - 1) for _ in range(3))
-        while pos1 == pos2:
-            pos2 = tuple(random.randint(0, cube.size - 1) for _ in range(3))
-        return pos1, pos2
+        return sampler.swap()
 
     def perform_multi_swap():
         new_cube = cube.cube.copy()
-        num_swaps = random.randint(2, 4)
-        positions = [tuple(random.randint(0, cube.size - 1) for _ in range(3)) for _ in range(num_swaps)]
+        positions = draw_multi_swap_positions(sampler)
         for i in range(len(positions) - 1):
             new_cube[positions[i]], new_cube[positions[i + 1]] = new_cube[positions[i + 1]], new_cube[positions[i]]
         return new_cube
 
-    def calculate_acceptance_probability(cost_difference, temperature):
+    def calculate_acceptance_probability(cost_difference, temperature, reference_cost):
         if cost_difference <= 0:
             return 1.0
-        normalized_delta = cost_difference / max(abs(current_cost), 1)
+        normalized_delta = cost_difference / max(abs(reference_cost), 1)
         normalized_delta = min(normalized_delta, 5.0)
         return math.exp(-normalized_delta / (temperature / initial_temperature))
 
+    def calibrated_temperature_schedule(iteration):
+        if calibrated['iterations_since_best'] >= reheat_after:
+            calibrated['iterations_since_best'] = 0
+            calibrated['reheats'] += 1
+            return max(current_temperature, calibrated['start_temperature'] * 0.5)
+
+        cooling_rate = calibrated['cooling_rate']
+        if (iteration + 1) % acceptance_window == 0 and calibrated['uphill_proposals'] > 0:
+            progress = (iteration + 1) / max_iterations
+            start_acceptance, end_acceptance = target_acceptance
+            target = start_acceptance ** (1 - progress) * end_acceptance ** progress
+            measured = calibrated['uphill_accepted'] / calibrated['uphill_proposals']
+            # Too many uphill moves accepted: cool faster, too few: slow down
+            cooling_rate *= 0.9 if measured > target else 1.1
+            calibrated['uphill_proposals'] = 0
+            calibrated['uphill_accepted'] = 0
+        return max(current_temperature * cooling_rate, calibrated['end_temperature'])
+
     def adaptive_temperature_schedule(iteration):
         if consecutive_non_improvements > 5000:
             return initial_temperature * 0.5
@@ -49,56 +205,133 @@ def simulated_annealing(cube,
         cooling_rate = 0.999 if stage < max_iterations // stage_iterations // 3 else 0.997 if stage < max_iterations // stage_iterations * 2 // 3 else 0.995
         return current_temperature * cooling_rate
 
-    with tqdm(total=max_iterations) as pbar:
-        for iteration in range(max_iterations):
-            if current_temperature < min_temperature or current_cost == 0:
+    iteration = start_iteration
+    with tqdm(total=max_iterations, initial=start_iteration) as pbar:
+        for iteration in range(start_iteration, max_iterations):
+            # A surrogate value of 0 also means every line is magic
+            if (calibrated is None and current_temperature < min_temperature) or \
+                    (surrogate.value if surrogate is not None else current_cost) == 0:
                 break
 
+            previous_best = best_value
             pos1, pos2 = get_problem_specific_neighbor()
-            if random.random() < multi_swap_probability:
-                new_cube = perform_multi_swap()
+            if scheduler is not None:
+                operator = scheduler.select()
+                multi_swap = False
+                if operator == 'line_swap':
+                    pos1, pos2 = draw_line_swap_positions(sampler, line_cells)
             else:
+                multi_swap = sampler.uniform() < multi_swap_probability
+            if multi_swap:
+                new_cube = perform_multi_swap()
+            elif surrogate is None:
                 cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
 
-            new_cost = cube.calculate_cost()
-            cost_difference = new_cost - current_cost
-            
-            acceptance_prob = calculate_acceptance_probability(cost_difference, current_temperature)
+            if surrogate is None:
+                new_cost = cube.calculate_cost()
+                cost_difference = new_cost - current_cost
+                acceptance_prob = calculate_acceptance_probability(cost_difference, current_temperature, current_cost)
+            else:
+                index1 = pos1[0] * cube.size**2 + pos1[1] * cube.size + pos1[2]
+                index2 = pos2[0] * cube.size**2 + pos2[1] * cube.size + pos2[2]
+                cost_difference = 0 if multi_swap else surrogate.swap_delta(index1, index2)
+                acceptance_prob = calculate_acceptance_probability(cost_difference, current_temperature, surrogate.value)
+
+            if scheduler is not None:
+                scheduler.update(operator, cost_difference < 0)
+
+            accepted = sampler.uniform() < acceptance_prob
+            if calibrated is not None and cost_difference > 0:
+                calibrated['uphill_proposals'] += 1
+                calibrated['uphill_accepted'] += accepted
 
-            if random.random() < acceptance_prob:
+            if accepted:
+                if surrogate is not None:
+                    if not multi_swap:
+                        surrogate.apply_swap(index1, index2)
+                    new_cost = surrogate.value
                 current_cost = new_cost
                 steps.append({
                     'index1': pos1, 
                     'index2': pos2, 
                     'cost': current_cost,
-                    'exp_value': acceptance_prob
+                    'exp_value': acceptance_prob,
+                    # 'accepted' marks whether pos1/pos2 were actually swapped in the cube
+                    'accepted': not multi_swap
                 })
                 if cost_difference < 0:
                     consecutive_non_improvements = 0
-                    if new_cost < best_cost:
-                        best_cost = new_cost
+                    if new_cost < best_value:
+                        best_value = new_cost
                         best_configuration = cube.cube.copy()
+                        if surrogate is None:
+                            best_cost = new_cost
+                        else:
+                            best_is_scored = False
                 else:
                     consecutive_non_improvements += 1
             else:
-                cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
+                if surrogate is None:
+                    cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
                 steps.append({
                     'index1': pos1, 
                     'index2': pos2, 
                     'cost': current_cost,
-                    'exp_value': acceptance_prob
+                    'exp_value': acceptance_prob,
+                    'accepted': False
                 })
                 consecutive_non_improvements += 1
+
+            if surrogate is not None and (iteration + 1) % exact_interval == 0:
+                # Periodic exact verification, whether or not this iteration's move was accepted
+                current_cost = surrogate.sync()
+                if not best_is_scored:
+                    best_cost = score_best()
+                    best_is_scored = True
             
             # Check for being stuck in local optima
             if consecutive_non_improvements > 1000:
                 stuck_in_local_optima += 1
                 consecutive_non_improvements = 0  # Reset counter after counting as stuck
 
-            current_temperature = adaptive_temperature_schedule(iteration)
+            if calibrated is not None:
+                calibrated['iterations_since_best'] = 0 if best_value < previous_best else calibrated['iterations_since_best'] + 1
+                current_temperature = calibrated_temperature_schedule(iteration)
+            else:
+                current_temperature = adaptive_temperature_schedule(iteration)
             temperatures.append(current_temperature)
             pbar.update(1)
-            pbar.set_postfix({'Cost': current_cost, 'Temp': f'{current_temperature:.2f}', 'Best': best_cost})
+            pbar.set_postfix({'Cost': current_cost, 'Temp': f'{current_temperature:.2f}', 'Best': best_value})
+
+            if checkpoint is not None and checkpoint.due(iteration + 1):
+                checkpoint.save({
+                    'iteration': iteration + 1,
+                    'cube': cube.cube.copy(),
+                    'sampler': sampler,
+                    'current_temperature': current_temperature,
+                    'current_cost': current_cost,
+                    'best_cost': best_cost if best_is_scored else score_best(),
+                    'best_value': best_value,
+                    'best_configuration': best_configuration,
+                    'consecutive_non_improvements': consecutive_non_improvements,
+                    'stuck_in_local_optima': stuck_in_local_optima,
+                    'scheduler': scheduler,
+                    'calibrated': calibrated
+                })
 
+    if checkpoint is not None:
+        checkpoint.clear()
+        steps, temperatures = steps.sink, temperatures.sink
+    if calibrated is not None:
+        print(f"Reheats: {calibrated['reheats']}")
+    if not best_is_scored:
+        best_cost = score_best()
     cube.cube = best_configuration
+    if endgame:
+        # The trajectory ends at the current cube, not at the best configuration the endgame
+        # starts from, so its swaps are not recorded as steps
+        outcome = run_endgame(cube, endgame)
+        if outcome['solved']:
+            best_cost = outcome['cost']
+            best_configuration = cube.cube.copy()
     return best_cost, best_configuration, iteration, temperatures, steps, stuck_in_local_optima
\ No newline at end of file
@@ -1,15 +1,33 @@
-import numpy as np
-import itertools
 
-def steepest_ascent_hill_climbing(cube):
+from neighborhoods import neighborhood
+from objectives import make_objective, CANONICAL_OBJECTIVE
+from random_streams import make_rng
+from endgame import run_endgame
+
+def steepest_ascent_hill_climbing(cube, recorder=None, neighborhood_type='auto', sample_size=None, seed=None,
+                                  objective=CANONICAL_OBJECTIVE, endgame=None):
+    # neighborhood_type 'auto' scans every pair up to n=5 and a bounded candidate list above it
+    rng = make_rng(seed)
+    # With a surrogate objective ('l1', 'l2') neighbors are ranked by their O(1) surrogate delta and
+    # only the chosen swap is evaluated exactly, and kept only if it lowers the weighted cost
+    surrogate = make_objective(objective, cube) if objective != CANONICAL_OBJECTIVE else None
     max_iterations = 1000  # Define the maximum number of iterations allowed
     iteration = 0
     current_cost = cube.calculate_cost()  # Initial cost
     obj_values = []  # Collect the objective values for each iteration
-    steps = []  # Collect step data
+    steps = recorder if recorder is not None else []  # Collect step data (optionally streamed to disk)
 
     best_cube = cube.cube.copy()  # Keep a copy of the initial cube
 
+    def finish(cost, final_cube):
+        # Close the last few violated lines exactly when the endgame stage is enabled
+        if endgame:
+            cube.cube = final_cube
+            outcome = run_endgame(cube, endgame, steps)
+            if outcome['solved']:
+                return outcome['cost'], cube.cube.copy()
+        return cost, final_cube
+
     # Iterate until there are no conflicts (cost == 0) or max iterations are reached
     while current_cost > 0 and iteration < max_iterations:
         obj_values.append(current_cost)  # Record the current cost
@@ -18,26 +36,49 @@ def steepest_ascent_hill_climbing(cube):
         best_cost = current_cost  # Start with the current cost
         best_swap = None  # Track the best swap
 
-        # Explore all possible pairs of positions (i.e., every possible neighbor)
-        for pos1, pos2 in itertools.combinations(np.ndindex(cube.cube.shape), 2):
-            new_cube = cube.cube.copy()
+        if surrogate is not None:
+            best_delta = 0
+            for pos1, pos2 in neighborhood(neighborhood_type, cube, rng, sample_size):
+                delta = surrogate.swap_delta(pos1[0] * cube.size**2 + pos1[1] * cube.size + pos1[2],
+                                             pos2[0] * cube.size**2 + pos2[1] * cube.size + pos2[2])
+                if delta < best_delta:
+                    best_delta = delta
+                    best_swap = (pos1, pos2)
 
-            # Swap the two elements
-            new_cube[pos1], new_cube[pos2] = new_cube[pos2], new_cube[pos1]
+            if best_swap:
+                pos1, pos2 = best_swap
+                index1 = pos1[0] * cube.size**2 + pos1[1] * cube.size + pos1[2]
+                index2 = pos2[0] * cube.size**2 + pos2[1] * cube.size + pos2[2]
+                surrogate.apply_swap(index1, index2)
+                new_cost = cube.calculate_cost()
+                if new_cost < current_cost:
+                    best_cube = cube.cube.copy()
+                    best_cost = new_cost
+                else:
+                    # The surrogate improves but the weighted cost does not: undo the swap and
+                    # stop below as if no better neighbor was found
+                    surrogate.apply_swap(index1, index2)
+                    best_swap = None
+        else:
+            # Explore the neighborhood (every possible pair of positions for small cubes)
+            for pos1, pos2 in neighborhood(neighborhood_type, cube, rng, sample_size):
+                # Swap the two elements in place and score the neighbor
+                cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
+                new_cost = cube.calculate_cost()
 
-            # Set the cube to the new state and calculate the cost
-            cube.cube = new_cube
-            new_cost = cube.calculate_cost()
+                # If the new configuration has a lower cost, update the best cube
+                if new_cost < best_cost:
+                    best_cost = new_cost
+                    best_cube = cube.cube.copy()
+                    best_swap = (pos1, pos2)  # Track the swap
 
-            # If the new configuration has a lower cost, update the best cube
-            if new_cost < best_cost:
-                best_cost = new_cost
-                best_cube = new_cube.copy()
-                best_swap = (pos1, pos2)  # Track the swap
+                # Swap back so every neighbor is a single swap away from the current cube
+                cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
 
         # If no better configuration was found, stop the algorithm (local minimum)
         if best_cost == current_cost:
             print("No better neighbors found, stopping.")
+            best_cost, best_cube = finish(best_cost, best_cube)
             return best_cost, best_cube, iteration, steps
 
         # Update the cube with the best found neighbor configuration
@@ -61,4 +102,5 @@ def steepest_ascent_hill_climbing(cube):
 
         iteration += 1
 
+    current_cost, best_cube = finish(current_cost, best_cube)
     return current_cost, best_cube, iteration, steps
\ No newline at end of file
@@ -0,0 +1,91 @@
+import sys
+import json
+import time
+
+from magic_cube import MagicCube
+from lines import line_table
+from neighborhoods import neighborhood, NEIGHBORHOODS
+from random_streams import make_rng
+
+# The full neighborhood is only timed up to this many pairs, beyond that one scan takes minutes
+MAX_FULL_PAIRS = 200000
+
+
+def time_calls(function, min_seconds=0.2):
+    """Calls per second of a no-argument function, measured over at least min_seconds."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return calls / elapsed
+
+
+def neighborhood_scan(cube, name, rng, sample_size=None):
+    """Evaluate one iteration's neighborhood like steepest ascent does. Returns (pairs, seconds, best improvement)."""
+    current_cost = cube.calculate_cost()
+    original = cube.cube.copy()
+    best_cost = current_cost
+    pairs = 0
+    start = time.perf_counter()
+    for pos1, pos2 in neighborhood(name, cube, rng, sample_size):
+        new_cube = original.copy()
+        new_cube[pos1], new_cube[pos2] = new_cube[pos2], new_cube[pos1]
+        cube.cube = new_cube
+        best_cost = min(best_cost, cube.calculate_cost())
+        pairs += 1
+    elapsed = time.perf_counter() - start
+    cube.cube = original
+    return pairs, elapsed, current_cost - best_cost
+
+
+def benchmark_size(size, seed=0, sample_size=None):
+    rng = make_rng(seed)
+    cube = MagicCube(size=size, rng=rng)
+    cells = size**3
+    full_pairs = cells * (cells - 1) // 2
+    row = {
+        'size': size,
+        'cells': cells,
+        'lines': len(line_table(size)),
+        'full_pairs': full_pairs,
+        'cost_evals_per_second': time_calls(cube.calculate_cost),
+        'neighborhoods': {}
+    }
+
+    for name in NEIGHBORHOODS:
+        if name == 'full' and full_pairs > MAX_FULL_PAIRS:
+            continue
+        pairs, elapsed, improvement = neighborhood_scan(cube, name, rng, sample_size)
+        row['neighborhoods'][name] = {
+            'pairs': pairs,
+            'seconds': elapsed,
+            'pairs_per_second': pairs / elapsed if elapsed > 0 else None,
+            'improvement': improvement
+        }
+    return row
+
+
+def run_benchmark(sizes=range(3, 12), seed=0, sample_size=None, output_path="scaling_benchmark.json"):
+    """Benchmark cost evaluation and one steepest-ascent iteration per neighborhood for each size."""
+    rows = []
+    for size in sizes:
+        row = benchmark_size(size, seed, sample_size)
+        rows.append(row)
+        timings = ", ".join(f"{name}: {stats['pairs']} pairs in {stats['seconds']:.2f}s"
+                            for name, stats in row['neighborhoods'].items())
+        print(f"n={size}: {row['cost_evals_per_second']:.0f} cost evals/s, {row['full_pairs']} pairs in full neighborhood; {timings}")
+
+    if output_path is not None:
+        with open(output_path, "w") as f:
+            json.dump(rows, f, indent=2)
+    return rows
+
+
+if __name__ == "__main__":
+    # Usage: python benchmark_scaling.py [min_size] [max_size]
+    min_size = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    max_size = int(sys.argv[2]) if len(sys.argv) > 2 else 11
+    run_benchmark(range(min_size, max_size + 1))
@@ -0,0 +1,130 @@
+import os
+import time
+import pickle
+
+
+class Checkpointer:
+    """
+    Periodically saves the full state of a running algorithm so it can be resumed.
+
+    - interval: save every `interval` iterations (checking this is a single modulo per iteration).
+    - min_seconds: additionally skip saves closer than this many seconds to the previous one.
+    - resume: when True, restore() returns the last saved state so the algorithm continues from it.
+
+    Checkpoints are written to a temporary file, fsynced and renamed over the previous one,
+    so a crash during a save never leaves a corrupt checkpoint behind.
+
+    Growing series (steps, temperatures, objective values) are not part of the state: track()
+    wraps them so every save only appends the items added since the previous save to a log next
+    to the checkpoint, and the state only records how far each log is valid. On resume, track()
+    feeds the logged items back into the fresh sink (a list or a recorder).
+    """
+
+    def __init__(self, path, interval=1000, min_seconds=0, resume=False):
+        self.path = path
+        self.interval = interval
+        self.min_seconds = min_seconds
+        self.resume = resume
+        self.saves = 0
+        self._last_save = 0.0
+        self._series = {}
+        self._restored = None
+
+    def due(self, iteration):
+        if iteration % self.interval != 0:
+            return False
+        return time.monotonic() - self._last_save >= self.min_seconds
+
+    def _log_path(self, name):
+        return f"{self.path}.{name}.log"
+
+    def track(self, name, sink):
+        """
+        Wrap a growing series so saves log it incrementally. When resuming, the items logged up to
+        the restored checkpoint are appended to sink first.
+        """
+        log_path = self._log_path(name)
+        offsets = self._restored.get('_series', {}) if self._restored is not None else {}
+        if name in offsets:
+            # Drop anything logged after the checkpoint that is being resumed
+            with open(log_path, "r+b") as f:
+                f.truncate(offsets[name])
+            with open(log_path, "rb") as f:
+                while f.tell() < offsets[name]:
+                    for item in pickle.load(f):
+                        sink.append(item)
+        elif os.path.exists(log_path):
+            os.remove(log_path)
+        series = TrackedSeries(sink)
+        self._series[name] = series
+        return series
+
+    def save(self, state):
+        offsets = {}
+        for name, series in self._series.items():
+            with open(self._log_path(name), "ab") as f:
+                if series.pending:
+                    pickle.dump(series.pending, f, protocol=pickle.HIGHEST_PROTOCOL)
+                    f.flush()
+                    os.fsync(f.fileno())
+                offsets[name] = f.tell()
+            series.pending = []
+        state = {**state, '_series': offsets}
+
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+        self.saves += 1
+
+    def restore(self):
+        """The saved state if resuming and a checkpoint exists, otherwise None."""
+        if not self.resume or not os.path.exists(self.path):
+            return None
+        with open(self.path, "rb") as f:
+            self._restored = pickle.load(f)
+        return self._restored
+
+    def finish(self, result):
+        """Persist the result of the finished run, so a resumed session can skip it."""
+        tmp_path = self.path + ".done.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path + ".done")
+
+    def finished(self):
+        """The result stored by finish() if resuming and the run already finished, otherwise None."""
+        if not self.resume or not os.path.exists(self.path + ".done"):
+            return None
+        with open(self.path + ".done", "rb") as f:
+            return pickle.load(f)
+
+    def clear(self):
+        """Remove the checkpoint and its logs once the run has finished."""
+        for path in [self.path] + [self._log_path(name) for name in self._series]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class TrackedSeries:
+    """A list or recorder whose new items are also kept for the next checkpoint save."""
+
+    def __init__(self, sink):
+        self.sink = sink
+        self.pending = []
+
+    def __len__(self):
+        return len(self.sink)
+
+    def append(self, item):
+        self.sink.append(item)
+        self.pending.append(item)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
@@ -0,0 +1,164 @@
+import numpy as np
+
+from lines import line_table, cell_lines, magic_number
+
+# Defaults of the endgame stage: it only triggers with this many violated lines or fewer
+DEFAULT_MAX_VIOLATIONS = 12
+# Largest number of free cells searched exhaustively (the search space is their factorial)
+DEFAULT_MAX_CELLS = 16
+DEFAULT_NODE_LIMIT = 50000
+
+
+class _NodeLimit(Exception):
+    pass
+
+
+def violated_lines(flat, size):
+    return np.nonzero(flat[line_table(size)].sum(axis=1) != magic_number(size))[0]
+
+
+def endgame_cells(flat, size, num_cells):
+    """
+    The num_cells cells most implicated in the violations: ranked by the number of violated
+    lines through them, then by their total absolute deviation, so the cells at the crossings
+    of violated lines (e.g. the two cells of a bad swap) come first.
+    """
+    table = line_table(size)
+    deviations = np.abs(flat[table].sum(axis=1) - magic_number(size))
+    violated = (deviations > 0).astype(int)
+    incidence = cell_lines(size)
+    scores = [(-sum(violated[line] for line in incidence[cell]), -sum(deviations[line] for line in incidence[cell]), cell)
+              for cell in range(size**3)]
+    return [cell for violated_count, _, cell in sorted(scores)[:num_cells] if violated_count < 0]
+
+
+def solve_cells(flat, size, cells, node_limit=DEFAULT_NODE_LIMIT):
+    """
+    Branch and bound over the permutations of the values in `cells` so that every line through
+    them hits the magic number. Lines are pruned with sum bounds: the cells still free on a line
+    must be able to reach the missing amount with the smallest or largest values left.
+    Returns the solved flat cube or None (no solution among these cells, or node_limit reached).
+    """
+    table = line_table(size)
+    incidence = cell_lines(size)
+    magic = magic_number(size)
+    flat = np.asarray(flat).ravel().copy()
+    free = set(cells)
+    values = sorted(flat[cells].tolist())
+    used = [False] * len(values)
+
+    lines = {line for cell in cells for line in incidence[cell]}
+    partial = {line: sum(int(flat[cell]) for cell in table[line].tolist() if cell not in free) for line in lines}
+    remaining = {line: sum(1 for cell in table[line].tolist() if cell in free) for line in lines}
+
+    # Fill line by line, lines with the fewest free cells first, so lines are closed early
+    order = []
+    for line in sorted(lines, key=lambda line: remaining[line]):
+        order.extend(cell for cell in table[line].tolist() if cell in free and cell not in order)
+
+    def feasible(line):
+        need = magic - partial[line]
+        count = remaining[line]
+        if count == 0:
+            return need == 0
+        available = [value for value, taken in zip(values, used) if not taken]
+        return sum(available[:count]) <= need <= sum(available[-count:])
+
+    nodes = 0
+
+    def search(depth):
+        nonlocal nodes
+        if depth == len(order):
+            return True
+        nodes += 1
+        if nodes > node_limit:
+            raise _NodeLimit()
+        cell = order[depth]
+        for i, value in enumerate(values):
+            if used[i]:
+                continue
+            used[i] = True
+            for line in incidence[cell]:
+                partial[line] += value
+                remaining[line] -= 1
+            if all(feasible(line) for line in incidence[cell]) and search(depth + 1):
+                flat[cell] = value
+                return True
+            used[i] = False
+            for line in incidence[cell]:
+                partial[line] -= value
+                remaining[line] += 1
+        return False
+
+    try:
+        return flat if search(0) else None
+    except _NodeLimit:
+        return None
+
+
+def solve_endgame(cube, size, max_cells=DEFAULT_MAX_CELLS, node_limit=DEFAULT_NODE_LIMIT):
+    """
+    Exact search for a magic cube that only differs from `cube` on the cells most implicated in
+    its violations. The set of free cells grows two at a time up to max_cells.
+    Returns the solved flat cube or None.
+    """
+    flat = np.asarray(cube).ravel()
+    previous = None
+    for num_cells in range(2, max_cells + 1, 2):
+        cells = endgame_cells(flat, size, num_cells)
+        if cells == previous:
+            break
+        previous = cells
+        solution = solve_cells(flat, size, cells, node_limit)
+        # Violated lines without a free cell are out of reach of this cell set
+        if solution is not None and len(violated_lines(solution, size)) == 0:
+            return solution
+    return None
+
+
+def permutation_swaps(source, target):
+    """Swaps (flat index pairs) that turn source into target, one per cycle element."""
+    current = np.asarray(source).ravel().copy()
+    target = np.asarray(target).ravel()
+    position = {int(value): i for i, value in enumerate(current)}
+    swaps = []
+    for i in np.nonzero(current != target)[0].tolist():
+        if current[i] == target[i]:
+            continue
+        j = position[int(target[i])]
+        swaps.append((i, j))
+        position[int(current[i])] = j
+        position[int(current[j])] = i
+        current[i], current[j] = current[j], current[i]
+    return swaps
+
+
+def run_endgame(cube, options=True, steps=None):
+    """
+    Finish-path hook shared by the algorithms. When the cube has between 1 and max_violations
+    violated lines, try to close them exactly; on success the cube is changed in place and the
+    moves are appended to steps as swaps.
+    options is True for the defaults or a dict of max_violations, max_cells and node_limit.
+    Returns the outcome as a dict: 'solved', 'attempted' (whether the cube was close enough to
+    try), 'violations' before the endgame and 'cost', the new cost when solved, otherwise None.
+    """
+    options = {} if options is True else options
+    violations = cube.calculate_actual_cost()
+    outcome = {'solved': False, 'attempted': False, 'violations': violations, 'cost': None}
+    if violations == 0 or violations > options.get('max_violations', DEFAULT_MAX_VIOLATIONS):
+        return outcome
+
+    outcome['attempted'] = True
+    solution = solve_endgame(cube.cube, cube.size, options.get('max_cells', DEFAULT_MAX_CELLS),
+                             options.get('node_limit', DEFAULT_NODE_LIMIT))
+    if solution is None:
+        return outcome
+
+    flat = cube.cube.reshape(-1)
+    for index1, index2 in permutation_swaps(flat.copy(), solution):
+        flat[index1], flat[index2] = flat[index2], flat[index1]
+        if steps is not None:
+            steps.append({'index1': index1, 'index2': index2, 'cost': cube.calculate_cost()})
+    outcome['solved'] = True
+    outcome['cost'] = cube.calculate_cost()
+    return outcome
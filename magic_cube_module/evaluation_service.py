@@ -0,0 +1,223 @@
+"""
+Local micro-batching evaluation service for the cube objective.
+
+Many concurrent callers (sweeps, interactive requests, the magic-simulator) await
+evaluate(cube); requests arriving within max_latency seconds of each other are scored together
+with one vectorized batch_costs call, so every caller gets batch-level throughput.
+
+In-process:
+
+    async with EvaluationService(size=5) as service:
+        cost, violations = await service.evaluate(cube)
+
+Loopback socket (one JSON object per line, requests may be pipelined):
+
+    -> {"id": 1, "cube": [...125 values...]}
+    <- {"id": 1, "cost": 4213.7, "violations": 109}
+    -> {"metrics": true}
+    <- {"metrics": {...}}
+
+Run with: python evaluation_service.py [port]
+"""
+import sys
+import json
+import time
+import asyncio
+import itertools
+import numpy as np
+from collections import deque
+
+from magic_cube import batch_costs
+
+# Latencies kept for the percentiles reported by metrics()
+LATENCY_WINDOW = 10000
+
+
+class EvaluationService:
+    """
+    Collects evaluation requests into micro-batches. A batch is scored when it reaches
+    max_batch_size requests or when its first request has waited max_latency seconds,
+    whichever comes first.
+    """
+
+    def __init__(self, size=5, max_batch_size=512, max_latency=0.002, weights=None):
+        self.size = size
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.weights = weights
+        self._pending = []
+        self._timer = None
+        self._started = time.monotonic()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.batches = 0
+        self.batch_seconds = 0.0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.flush()
+
+    async def evaluate(self, cube):
+        """(cost, violations) of one cube."""
+        # Validated per request, so one malformed cube cannot fail the rest of its batch
+        flat = np.asarray(cube, dtype=np.int64).ravel()
+        if flat.size != self.size**3:
+            raise ValueError(f"Expected {self.size**3} values for a cube of size {self.size}, got {flat.size}")
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((flat, future, time.monotonic()))
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_latency, self.flush)
+        return await future
+
+    async def evaluate_many(self, cubes):
+        """Evaluate several cubes concurrently, results in order."""
+        return await asyncio.gather(*(self.evaluate(cube) for cube in cubes))
+
+    def flush(self):
+        """Score every pending request now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        start = time.perf_counter()
+        try:
+            costs, violations = batch_costs(np.stack([flat for flat, _, _ in batch]), self.size, self.weights)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batch_seconds += time.perf_counter() - start
+
+        now = time.monotonic()
+        for (_, future, submitted), cost, count in zip(batch, costs.tolist(), violations.tolist()):
+            # A caller may have been cancelled while waiting
+            if not future.done():
+                future.set_result((cost, count))
+            self._latencies.append(now - submitted)
+        self.requests += len(batch)
+        self.batches += 1
+
+    def metrics(self):
+        """Throughput and latency of the service since it was created."""
+        elapsed = time.monotonic() - self._started
+        latencies = np.array(self._latencies) if self._latencies else np.zeros(1)
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'mean_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'throughput': self.requests / elapsed if elapsed > 0 else 0.0,
+            'scoring_throughput': self.requests / self.batch_seconds if self.batch_seconds > 0 else 0.0,
+            'latency_p50': float(np.percentile(latencies, 50)),
+            'latency_p95': float(np.percentile(latencies, 95)),
+            'latency_max': float(latencies.max()),
+            'pending': len(self._pending)
+        }
+
+
+async def handle_client(service, reader, writer):
+    """Answer the JSON lines of one connection; requests are evaluated concurrently so they batch."""
+    write_lock = asyncio.Lock()
+
+    async def reply(response):
+        async with write_lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def answer(request):
+        request_id = request.get('id') if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict):
+                raise TypeError(f"Expected a JSON object, got {type(request).__name__}")
+            if request.get('metrics'):
+                response = {'metrics': service.metrics()}
+            elif 'cube' not in request:
+                raise ValueError("Request has neither 'cube' nor 'metrics'")
+            else:
+                cost, violations = await service.evaluate(request['cube'])
+                response = {'id': request_id, 'cost': cost, 'violations': violations}
+        except Exception as e:
+            # Every request gets an answer, so a failure never leaves its client waiting
+            response = {'id': request_id, 'error': str(e) or type(e).__name__}
+        await reply(response)
+
+    tasks = set()
+    try:
+        while line := await reader.readline():
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                task = asyncio.create_task(reply({'id': None, 'error': f"Invalid JSON: {e}"}))
+            else:
+                task = asyncio.create_task(answer(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+class EvaluationClient:
+    """Client of the loopback service; concurrent evaluate() calls are pipelined over one connection."""
+
+    def __init__(self, host="127.0.0.1", port=8766):
+        self.host = host
+        self.port = port
+        self._ids = itertools.count(1)
+        self._waiting = {}
+
+    async def __aenter__(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._receiver = asyncio.create_task(self._receive())
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self._writer.close()
+        self._receiver.cancel()
+
+    async def _receive(self):
+        while line := await self._reader.readline():
+            response = json.loads(line)
+            key = 'metrics' if 'metrics' in response else response.get('id')
+            future = self._waiting.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(response)
+
+    async def _request(self, key, request):
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[key] = future
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+        return await future
+
+    async def evaluate(self, cube):
+        request_id = next(self._ids)
+        response = await self._request(request_id, {'id': request_id, 'cube': np.asarray(cube).ravel().tolist()})
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['cost'], response['violations']
+
+    async def metrics(self):
+        return (await self._request('metrics', {'metrics': True}))['metrics']
+
+
+async def serve(host="127.0.0.1", port=8766, **options):
+    service = EvaluationService(**options)
+    server = await asyncio.start_server(lambda r, w: handle_client(service, r, w), host, port)
+    print(f"Evaluation service listening on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8766))
@@ -0,0 +1,219 @@
+import json
+import time
+import sqlite3
+import numpy as np
+from collections import defaultdict
+
+from lines import count_violations
+from solutions import canonical_hash
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    algorithm TEXT NOT NULL,
+    config_key TEXT NOT NULL,
+    seed INTEGER,
+    size INTEGER NOT NULL,
+    initial_cost REAL,
+    final_cost REAL NOT NULL,
+    violations INTEGER NOT NULL,
+    duration REAL,
+    num_steps INTEGER,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS params (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    value REAL
+);
+CREATE TABLE IF NOT EXISTS solutions (
+    canonical_hash TEXT NOT NULL,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    cube BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trajectories (
+    run_id INTEGER PRIMARY KEY REFERENCES runs(id),
+    index1 BLOB,
+    index2 BLOB,
+    cost BLOB,
+    sidecar_path TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_algorithm ON runs(algorithm, config_key);
+CREATE INDEX IF NOT EXISTS runs_config ON runs(config_key);
+CREATE INDEX IF NOT EXISTS runs_seed ON runs(seed);
+CREATE INDEX IF NOT EXISTS params_name_value ON params(name, value);
+CREATE INDEX IF NOT EXISTS metrics_run ON metrics(run_id, name);
+CREATE INDEX IF NOT EXISTS solutions_hash ON solutions(canonical_hash);
+"""
+
+
+def config_key(params):
+    """Canonical string of a parameter dict, runs with equal keys share a configuration."""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class ExperimentStore:
+    """
+    SQLite store for experiment results: runs, their params and metrics, verified solutions
+    and the step trajectory (as compact blobs, or a path to a recorder directory).
+    """
+
+    def __init__(self, path="experiments.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def add_runs(self, runs):
+        """
+        Insert many runs in a single transaction. Each run is a dict with:
+        algorithm, final_cube, final_cost and optionally params, seed, initial_cost, duration,
+        metrics (dict), trajectory (dict of index1/index2/cost arrays) or trajectory_path.
+        Returns the new run ids.
+        """
+        run_ids = []
+        with self.conn:
+            for run in runs:
+                final_cube = np.asarray(run['final_cube']).ravel()
+                size = round(len(final_cube) ** (1 / 3))
+                violations = int(count_violations(final_cube, size)[0])
+                params = run.get('params', {})
+                trajectory = run.get('trajectory')
+
+                cursor = self.conn.execute(
+                    "INSERT INTO runs (algorithm, config_key, seed, size, initial_cost, final_cost, violations, "
+                    "duration, num_steps, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run['algorithm'], config_key(params), run.get('seed'), size, run.get('initial_cost'),
+                     float(run['final_cost']), violations, run.get('duration'),
+                     len(trajectory['cost']) if trajectory is not None else None, time.time())
+                )
+                run_id = cursor.lastrowid
+                run_ids.append(run_id)
+
+                self.conn.executemany(
+                    "INSERT INTO params (run_id, name, value) VALUES (?, ?, ?)",
+                    [(run_id, name, json.dumps(value, default=str)) for name, value in params.items()]
+                )
+                self.conn.executemany(
+                    "INSERT INTO metrics (run_id, name, value) VALUES (?, ?, ?)",
+                    [(run_id, name, float(value)) for name, value in run.get('metrics', {}).items()]
+                )
+                if violations == 0:
+                    self.conn.execute(
+                        "INSERT INTO solutions (canonical_hash, run_id, cube) VALUES (?, ?, ?)",
+                        (canonical_hash(final_cube, size), run_id, final_cube.astype(np.int16).tobytes())
+                    )
+                if trajectory is not None or run.get('trajectory_path'):
+                    self.conn.execute(
+                        "INSERT INTO trajectories (run_id, index1, index2, cost, sidecar_path) VALUES (?, ?, ?, ?, ?)",
+                        (run_id,
+                         np.asarray(trajectory['index1'], dtype=np.int16).tobytes() if trajectory is not None else None,
+                         np.asarray(trajectory['index2'], dtype=np.int16).tobytes() if trajectory is not None else None,
+                         np.asarray(trajectory['cost'], dtype=np.float32).tobytes() if trajectory is not None else None,
+                         run.get('trajectory_path'))
+                    )
+        return run_ids
+
+    def add_search_results(self, algorithm, results, params=None):
+        """Store every RunRecord of a SearchResults, using the replay seeds when available."""
+        runs = []
+        for record in results.runs:
+            replay = record.replay
+            columns = record.columns()
+            runs.append({
+                'algorithm': algorithm,
+                'params': replay.params if replay is not None else (params or {}),
+                'seed': replay.seed if replay is not None else None,
+                'initial_cost': record.initial_cost,
+                'final_cost': record.final_cost,
+                'final_cube': record.final_cube,
+                'duration': record.duration,
+                'trajectory': {'index1': columns['index1'], 'index2': columns['index2'], 'cost': columns['cost']}
+            })
+        return self.add_runs(runs)
+
+    def add_genetic_results(self, results):
+        """Store genetic_algorithm result dicts; the per-generation objective becomes metrics."""
+        runs = []
+        for result in results:
+            objective = list(result["objective_per_iteration"])
+            runs.append({
+                'algorithm': 'genetic',
+                'params': {'population_size': result["population_size"], 'iterations': result["iterations"],
+                           'mode': result.get("mode", "generational"), 'memetic': result.get("memetic")},
+                'final_cost': result["final_cost"],
+                'final_cube': result["final_cube"],
+                'duration': result["duration"],
+                'metrics': {'generations': len(objective), 'final_max_objective': objective[-1][0]} if objective else {}
+            })
+        return self.add_runs(runs)
+
+    def find_runs(self, algorithm=None, seed=None, **params):
+        """Run rows matching an algorithm, a seed and/or parameter values."""
+        query = "SELECT r.id, r.algorithm, r.config_key, r.seed, r.final_cost, r.violations, r.duration FROM runs r"
+        conditions, args = [], []
+        for i, (name, value) in enumerate(params.items()):
+            query += f" JOIN params p{i} ON p{i}.run_id = r.id AND p{i}.name = ? AND p{i}.value = ?"
+            args += [name, json.dumps(value, default=str)]
+        if algorithm is not None:
+            conditions.append("r.algorithm = ?")
+            args.append(algorithm)
+        if seed is not None:
+            conditions.append("r.seed = ?")
+            args.append(seed)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return self.conn.execute(query, args).fetchall()
+
+    def summary(self, algorithm=None):
+        """
+        Mean and median final cost and duration per (algorithm, configuration).
+        Returns a list of dicts sorted by mean cost.
+        """
+        query = "SELECT algorithm, config_key, final_cost, duration, violations FROM runs"
+        args = []
+        if algorithm is not None:
+            query += " WHERE algorithm = ?"
+            args.append(algorithm)
+
+        groups = defaultdict(list)
+        for alg, key, cost, duration, violations in self.conn.execute(query, args):
+            groups[(alg, key)].append((cost, duration if duration is not None else np.nan, violations))
+
+        rows = []
+        for (alg, key), values in groups.items():
+            costs, durations, violations = (np.array(column, dtype=float) for column in zip(*values))
+            rows.append({
+                'algorithm': alg,
+                'params': json.loads(key),
+                'runs': len(values),
+                'mean_cost': float(costs.mean()),
+                'median_cost': float(np.median(costs)),
+                'mean_duration': float(np.nanmean(durations)) if not np.isnan(durations).all() else None,
+                'median_duration': float(np.nanmedian(durations)) if not np.isnan(durations).all() else None,
+                'solved': int((violations == 0).sum())
+            })
+        return sorted(rows, key=lambda row: row['mean_cost'])
+
+    def trajectory(self, run_id):
+        """The stored trajectory of a run as a dict of arrays, or its sidecar path."""
+        row = self.conn.execute(
+            "SELECT index1, index2, cost, sidecar_path FROM trajectories WHERE run_id = ?", (run_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        index1, index2, cost, sidecar_path = row
+        if index1 is None:
+            return {'sidecar_path': sidecar_path}
+        return {
+            'index1': np.frombuffer(index1, dtype=np.int16),
+            'index2': np.frombuffer(index2, dtype=np.int16),
+            'cost': np.frombuffer(cost, dtype=np.float32)
+        }
@@ -0,0 +1,177 @@
+import os
+import json
+import shutil
+import numpy as np
+
+from lines import line_table
+
+# Bump when the chunk layout changes so the simulator can refuse files it cannot read
+# (together with EXPORT_VERSION in magic-simulator/app/data/trajectoryLoader.js)
+EXPORT_VERSION = 4
+
+# Steps between two full-cube keyframes, any step is reconstructed with at most this many swaps
+DEFAULT_KEYFRAME_INTERVAL = 512
+
+# Steps per chunk file (a multiple of the keyframe interval), the simulator fetches one chunk at a time
+DEFAULT_CHUNK_SIZE = 4096
+
+
+def write_chunk(path, index1, index2, cost, keyframes, line_sums, applied):
+    """
+    Write one chunk as little-endian column blocks, in this order:
+    int16 index1[count], int16 index2[count], float32 cost[count],
+    int32 line_sums[count, lines], int16 keyframes[num_keyframes, size^3], uint8 applied[count].
+    The float32 block starts at byte 4 * count and the int32 block at 8 * count, so both are
+    always 4-byte aligned. Line sums are int32 because the magic number passes 32767 from n = 14.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(np.asarray(index1, dtype='<i2').tobytes())
+        f.write(np.asarray(index2, dtype='<i2').tobytes())
+        f.write(np.asarray(cost, dtype='<f4').tobytes())
+        f.write(np.asarray(line_sums, dtype='<i4').tobytes())
+        f.write(np.asarray(keyframes, dtype='<i2').tobytes())
+        f.write(np.asarray(applied, dtype=np.uint8).tobytes())
+    os.replace(tmp_path, path)
+
+
+def build_keyframes_and_line_sums(run, keyframe_interval, columns=None):
+    """
+    Replay the swaps of a RunRecord from its initial cube, jumping to the start cube of each of
+    its segments (restarts) at the segment's first step.
+    `columns` are the run's step columns if the caller already read them.
+
+    Returns (keyframes, line_sums): keyframes[j] is the cube before step j * keyframe_interval,
+    line_sums[k] holds the sum of every line after step k.
+    """
+    size = round(len(run.initial_cube) ** (1 / 3))
+    table = line_table(size)
+    columns = columns if columns is not None else run.columns()
+    applied = run.applied_mask(columns)
+    index1, index2 = columns['index1'], columns['index2']
+    num_steps = len(columns['cost'])
+
+    segment_starts = dict(run.segments)
+    cube = segment_starts.pop(0, run.initial_cube).astype(np.int16)
+    keyframes = []
+    line_sums = np.empty((num_steps, len(table)), dtype=np.int32)
+    current_sums = cube[table].sum(axis=1, dtype=np.int32)
+
+    # Lines containing each cell, so a swap only updates the lines it touches
+    cell_lines = [np.nonzero((table == cell).any(axis=1))[0] for cell in range(size**3)]
+
+    for k in range(num_steps):
+        if k in segment_starts:
+            cube = segment_starts[k].astype(np.int16)
+            current_sums = cube[table].sum(axis=1, dtype=np.int32)
+        if k % keyframe_interval == 0:
+            keyframes.append(cube.copy())
+        i1, i2 = int(index1[k]), int(index2[k])
+        if applied[k] and i1 != i2:
+            delta = int(cube[i2]) - int(cube[i1])
+            current_sums[cell_lines[i1]] += delta
+            current_sums[cell_lines[i2]] -= delta
+            cube[i1], cube[i2] = cube[i2], cube[i1]
+        line_sums[k] = current_sums
+
+    return np.array(keyframes, dtype=np.int16).reshape((-1, size**3)), line_sums
+
+
+def write_chunked_run(run, directory, chunk_size=DEFAULT_CHUNK_SIZE, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+    """
+    Split the steps of a RunRecord into chunk files and return the run's manifest entry.
+    Step k lives in chunk k // chunk_size, its nearest keyframe is k // keyframe_interval.
+    A run with restarts lists their first step and start cube under "segments"; reconstructing a
+    step from its keyframe starts over from a segment's cube when it passes the segment's first step.
+    """
+    if chunk_size % keyframe_interval != 0:
+        raise ValueError("chunk_size must be a multiple of keyframe_interval")
+
+    os.makedirs(directory, exist_ok=True)
+    size = round(len(run.initial_cube) ** (1 / 3))
+    columns = run.columns()
+    num_steps = len(columns['cost'])
+    keyframes, line_sums = build_keyframes_and_line_sums(run, keyframe_interval, columns)
+    applied = run.applied_mask(columns)
+    keyframes_per_chunk = chunk_size // keyframe_interval
+    chunks = []
+
+    for k, start in enumerate(range(0, num_steps, chunk_size)):
+        stop = min(start + chunk_size, num_steps)
+        chunk_keyframes = keyframes[k * keyframes_per_chunk:(k + 1) * keyframes_per_chunk]
+        name = f"chunk_{k:05d}.bin"
+        write_chunk(os.path.join(directory, name), columns['index1'][start:stop], columns['index2'][start:stop],
+                    columns['cost'][start:stop], chunk_keyframes, line_sums[start:stop], applied[start:stop])
+        chunks.append({
+            "file": name,
+            "start": start,
+            "count": stop - start,
+            "keyframes": len(chunk_keyframes)
+        })
+
+    return {
+        "num_steps": num_steps,
+        "size": size,
+        "num_lines": len(line_table(size)),
+        "chunk_size": chunk_size,
+        "keyframe_interval": keyframe_interval,
+        "initial_cube": run.initial_cube.tolist(),
+        "segments": [{"start": start, "cube": cube.tolist()} for start, cube in run.segments if start > 0],
+        "chunks": chunks
+    }
+
+
+def export_results(results_by_name, out_dir, chunk_size=DEFAULT_CHUNK_SIZE, keyframe_interval=DEFAULT_KEYFRAME_INTERVAL):
+    """
+    Export the trajectories of every run as binary chunks plus a small manifest.json.
+
+    results_by_name maps the algorithm name used by the simulator to its SearchResults.
+    Files are laid out as <out_dir>/<name>/run_<k>/chunk_<i>.bin and the manifest paths
+    are relative to out_dir.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = {"version": EXPORT_VERSION, "algorithms": []}
+
+    for name, results in results_by_name.items():
+        # Remove chunks left over from a previous, possibly longer, export
+        shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+
+        runs = []
+        for i, run in enumerate(results.runs):
+            run_path = f"{name}/run_{i + 1}"
+            entry = write_chunked_run(run, os.path.join(out_dir, name, f"run_{i + 1}"), chunk_size, keyframe_interval)
+            entry["path"] = run_path
+            entry["final_cost"] = run.final_cost
+            entry["time"] = run.duration
+            runs.append(entry)
+        manifest["algorithms"].append({"name": name, "runs": runs})
+
+    tmp_path = os.path.join(out_dir, "manifest.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(out_dir, "manifest.json"))
+    return manifest
+
+
+def read_chunk(path, chunk, size, num_lines):
+    """
+    Read a chunk file back into a dict of arrays.
+    `chunk` is the chunk's manifest entry, size and num_lines come from the run entry.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    count = chunk["count"]
+    num_keyframes = chunk["keyframes"]
+    offset = 0
+    blocks = {}
+    for name, dtype, length, shape in [
+        ("index1", '<i2', count, (count,)),
+        ("index2", '<i2', count, (count,)),
+        ("cost", '<f4', count, (count,)),
+        ("line_sums", '<i4', count * num_lines, (count, num_lines)),
+        ("keyframes", '<i2', num_keyframes * size**3, (num_keyframes, size**3)),
+        ("applied", np.uint8, count, (count,))
+    ]:
+        blocks[name] = np.frombuffer(data, dtype=dtype, count=length, offset=offset).reshape(shape)
+        offset += length * np.dtype(dtype).itemsize
+    return blocks
@@ -0,0 +1,99 @@
+import numpy as np
+from functools import lru_cache
+
+
+def magic_number(size):
+    """
+    Calculate the magic number for a magic cube.
+    Formula: size * (size^3 + 1) // 2
+    """
+    return (size * (size**3 + 1)) // 2
+
+
+# Line tables built (or installed from shared memory) so far, by size
+_line_tables = {}
+
+
+def line_table(size):
+    """
+    Flat cell indices of every line checked by MagicCube.calculate_cost, one line per row.
+    The order matches calculate_cost: rows, columns, pillars, level diagonals
+    (main then anti for each level) and the four space diagonals.
+    Built once per size and process.
+    """
+    table = _line_tables.get(size)
+    if table is None:
+        table = _line_tables[size] = _build_line_table(size)
+    return table
+
+
+def install_line_table(size, table):
+    """Use a ready read-only table for this size, e.g. a view of a shared memory block."""
+    _line_tables[size] = table
+
+
+def _build_line_table(size):
+    idx = np.arange(size**3).reshape((size, size, size))
+    r = np.arange(size)
+    lines = []
+
+    # Rows, columns and pillars
+    for level in range(size):
+        for row in range(size):
+            lines.append(idx[level, row, :])
+    for level in range(size):
+        for col in range(size):
+            lines.append(idx[level, :, col])
+    for row in range(size):
+        for col in range(size):
+            lines.append(idx[:, row, col])
+
+    # Main and anti diagonals on each level
+    for level in range(size):
+        lines.append(idx[level, r, r])
+        lines.append(idx[level, r, size - 1 - r])
+
+    # Space diagonals
+    lines.append(idx[r, r, r])
+    lines.append(idx[r, r, size - 1 - r])
+    lines.append(idx[r, size - 1 - r, r])
+    lines.append(idx[r, size - 1 - r, size - 1 - r])
+
+    table = np.array(lines)
+    table.setflags(write=False)
+    return table
+
+
+@lru_cache(maxsize=None)
+def cell_lines(size):
+    """Line incidence: for every flat cell index, the tuple of line ids (rows of line_table) through it."""
+    incidence = [[] for _ in range(size**3)]
+    for line, cells in enumerate(line_table(size).tolist()):
+        for cell in cells:
+            incidence[cell].append(line)
+    return tuple(tuple(lines) for lines in incidence)
+
+
+def line_group_sizes(size):
+    """Number of lines of each type, in line_table order."""
+    return {
+        'rows': size**2,
+        'columns': size**2,
+        'pillars': size**2,
+        'level_diagonals': 2 * size,
+        'space_diagonals': 4
+    }
+
+
+def line_sums(cubes, size):
+    """
+    Sum of every line for one cube or a batch of cubes in a single vectorized call.
+    Accepts anything that reshapes to (-1, size^3) and returns an array of shape (batch, lines).
+    """
+    flat = np.asarray(cubes).reshape((-1, size**3))
+    return flat[:, line_table(size)].sum(axis=2)
+
+
+def count_violations(cubes, size):
+    """Number of lines that miss the magic number, per cube."""
+    return (line_sums(cubes, size) != magic_number(size)).sum(axis=1)
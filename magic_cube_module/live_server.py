@@ -0,0 +1,285 @@
+"""
+Local live view of running searches for the magic-simulator.
+
+Searches run as background tasks (in worker threads, the algorithms are synchronous) and
+stream batched step updates to clients over Server-Sent Events:
+
+    POST /runs                  {"algorithm": "simulated_annealing", "params": {...}} -> {"run_id": ...}
+    GET  /runs                  list of runs and their latest cost
+    GET  /runs/<run_id>/events  SSE stream of batches
+
+The solver never waits for clients: batches are handed to the event loop without blocking and
+every client has a bounded queue. When a slow client falls behind, its pending batches are
+coalesced into one, which still carries the latest full cube so the client can resync.
+
+Run with: python live_server.py [port]
+"""
+import sys
+import json
+import time
+import asyncio
+import itertools
+import numpy as np
+
+from magic_cube import MagicCube
+from algorithms.steepestascenthc import steepest_ascent_hill_climbing
+from algorithms.sidewaysmovehc import hill_climbing_with_sideways_move
+from algorithms.randomrestarthc import random_restart_hill_climbing
+from algorithms.stochastichc import stochastic_hill_climbing
+from algorithms.simulatedannealing import simulated_annealing
+from results import flat_index
+
+# Local search algorithms that can be started from the simulator, with their default params
+ALGORITHMS = {
+    'steepest_ascent': (steepest_ascent_hill_climbing, {}),
+    'sideways_move': (hill_climbing_with_sideways_move, {'max_sideways_moves': 10, 'max_iterations': 100}),
+    'random_restart': (random_restart_hill_climbing, {'max_restarts': 3}),
+    'stochastic': (stochastic_hill_climbing, {}),
+    'simulated_annealing': (simulated_annealing, {})
+}
+
+
+class LiveRecorder:
+    """
+    Step sink used by a running algorithm. Steps are collected in the solver thread and
+    handed to the event loop as one batch every batch_size steps or flush_interval seconds.
+    """
+
+    def __init__(self, hub, run_id, cube, batch_size=256, flush_interval=0.1):
+        self.hub = hub
+        self.run_id = run_id
+        self.cube = cube
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._pending = []
+        self._last_flush = time.monotonic()
+
+    def __len__(self):
+        return self.count
+
+    def append(self, step):
+        self._pending.append([
+            flat_index(step['index1'], self.cube.cube.shape),
+            flat_index(step['index2'], self.cube.cube.shape),
+            float(step['cost']),
+            int(step.get('accepted', True))
+        ])
+        self.count += 1
+        if len(self._pending) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def extend(self, steps):
+        for step in steps:
+            self.append(step)
+
+    def flush(self, event='batch'):
+        batch = {
+            'type': event,
+            'run_id': self.run_id,
+            'start': self.count - len(self._pending),
+            'steps': self._pending,
+            'cost': self._pending[-1][2] if self._pending else None,
+            'cube': self.cube.cube.ravel().tolist()
+        }
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self.hub.publish_threadsafe(self.run_id, batch)
+
+
+class ClientChannel:
+    """Bounded per-client queue; falls back to coalescing instead of growing or blocking."""
+
+    def __init__(self, max_pending=16):
+        self.max_pending = max_pending
+        self.pending = []
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, batch):
+        if len(self.pending) >= self.max_pending:
+            self.pending = [coalesce(self.pending + [batch])]
+            self.coalesced += 1
+        else:
+            self.pending.append(batch)
+        self.ready.set()
+
+    async def take(self):
+        await self.ready.wait()
+        self.ready.clear()
+        batches, self.pending = self.pending, []
+        return batches
+
+
+def coalesce(batches):
+    """
+    Merge consecutive batches into one snapshot: individual swaps are dropped,
+    the latest cube, cost and step counter are kept.
+    """
+    last = batches[-1]
+    done = any(batch['type'] == 'done' for batch in batches)
+    return {
+        'type': 'done' if done else 'snapshot',
+        'run_id': last['run_id'],
+        'start': last['start'] + len(last['steps']),
+        'steps': [],
+        'cost': next((batch['cost'] for batch in reversed(batches) if batch['cost'] is not None), None),
+        'cube': last['cube'],
+        **({'final_cost': last['final_cost']} if 'final_cost' in last else {})
+    }
+
+
+class LiveHub:
+    """Keeps track of running searches and fans their batches out to subscribed clients."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.runs = {}
+        self.subscribers = {}
+        self._ids = itertools.count(1)
+
+    def publish_threadsafe(self, run_id, batch):
+        # Never blocks the solver thread
+        self.loop.call_soon_threadsafe(self.publish, run_id, batch)
+
+    def publish(self, run_id, batch):
+        run = self.runs[run_id]
+        run['latest'] = batch
+        if batch['cost'] is not None:
+            run['cost'] = batch['cost']
+        for channel in self.subscribers.get(run_id, []):
+            channel.push(batch)
+
+    def subscribe(self, run_id):
+        channel = ClientChannel()
+        self.subscribers.setdefault(run_id, []).append(channel)
+        # Late joiners start from the latest known state
+        latest = self.runs[run_id].get('latest')
+        if latest is not None:
+            channel.push(coalesce([latest]))
+        return channel
+
+    def unsubscribe(self, run_id, channel):
+        self.subscribers.get(run_id, []).remove(channel)
+
+    def start_run(self, algorithm, params=None, cube_data=None, size=5):
+        func, defaults = ALGORITHMS[algorithm]
+        params = {**defaults, **(params or {})}
+        run_id = str(next(self._ids))
+        cube = MagicCube(cube_data=cube_data, size=size)
+        self.runs[run_id] = {'run_id': run_id, 'algorithm': algorithm, 'params': params, 'status': 'running', 'cost': None}
+        recorder = LiveRecorder(self, run_id, cube)
+
+        def run_search():
+            result = func(cube, recorder=recorder, **params)
+            recorder.flush()
+            return result
+
+        async def run_in_background():
+            try:
+                result = await asyncio.to_thread(run_search)
+                self.runs[run_id]['status'] = 'done'
+                final = {
+                    'type': 'done', 'run_id': run_id, 'start': recorder.count, 'steps': [],
+                    'cost': float(result[0]), 'final_cost': float(result[0]),
+                    'cube': np.asarray(result[1]).ravel().tolist()
+                }
+            except Exception as e:
+                self.runs[run_id]['status'] = f'failed: {e}'
+                final = {'type': 'done', 'run_id': run_id, 'start': recorder.count, 'steps': [],
+                         'cost': None, 'cube': cube.cube.ravel().tolist(), 'error': str(e)}
+            self.publish(run_id, final)
+
+        self.runs[run_id]['task'] = self.loop.create_task(run_in_background())
+        return run_id
+
+
+async def handle_client(hub, reader, writer):
+    """Minimal HTTP/1.1 handler for the three endpoints."""
+    try:
+        request_line = (await reader.readline()).decode().strip()
+        if not request_line:
+            return
+        method, path, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode().strip()
+            if not line:
+                break
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+        parts = [part for part in path.split("?")[0].split("/") if part]
+        if method == "OPTIONS":
+            await send_response(writer, 204, b"")
+        elif method == "POST" and parts == ["runs"]:
+            request = json.loads(body or b"{}")
+            if request.get('algorithm') not in ALGORITHMS:
+                await send_json(writer, 400, {'error': f"algorithm must be one of {list(ALGORITHMS)}"})
+                return
+            run_id = hub.start_run(request['algorithm'], request.get('params'), request.get('cube'), request.get('size', 5))
+            await send_json(writer, 200, {'run_id': run_id})
+        elif method == "GET" and parts == ["runs"]:
+            runs = [{key: value for key, value in run.items() if key not in ('task', 'latest')} for run in hub.runs.values()]
+            await send_json(writer, 200, runs)
+        elif method == "GET" and len(parts) == 3 and parts[0] == "runs" and parts[2] == "events" and parts[1] in hub.runs:
+            await stream_events(hub, parts[1], writer)
+        else:
+            await send_json(writer, 404, {'error': 'not found'})
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+STATUS_TEXT = {200: "OK", 204: "No Content", 400: "Bad Request", 404: "Not Found"}
+
+CORS_HEADERS = (
+    "Access-Control-Allow-Origin: *\r\n"
+    "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+    "Access-Control-Allow-Headers: Content-Type\r\n"
+)
+
+
+async def send_response(writer, status, body, content_type="application/json"):
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+        f"{CORS_HEADERS}Connection: close\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+
+
+async def send_json(writer, status, data):
+    await send_response(writer, status, json.dumps(data).encode())
+
+
+async def stream_events(hub, run_id, writer):
+    writer.write(
+        f"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+        f"{CORS_HEADERS}Connection: keep-alive\r\n\r\n".encode()
+    )
+    await writer.drain()
+    channel = hub.subscribe(run_id)
+    try:
+        while True:
+            for batch in await channel.take():
+                writer.write(f"event: {batch['type']}\ndata: {json.dumps(batch)}\n\n".encode())
+                # A slow client only stalls its own task; new batches coalesce meanwhile
+                await writer.drain()
+                if batch['type'] == 'done':
+                    return
+    finally:
+        hub.unsubscribe(run_id, channel)
+
+
+async def serve(host="127.0.0.1", port=8765):
+    hub = LiveHub(asyncio.get_running_loop())
+    server = await asyncio.start_server(lambda r, w: handle_client(hub, r, w), host, port)
+    print(f"Live server listening on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
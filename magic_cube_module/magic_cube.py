@@ -0,0 +1,122 @@
+import numpy as np
+
+from seeding import initial_cube
+from lines import line_table, line_group_sizes, line_sums, magic_number
+
+# Extra penalty for large deviations per line group (rows, columns, pillars, level diagonals,
+# space diagonals): the deviation threshold as a fraction of the magic number, and the
+# multiplier of the 'deviation_penalty' weight above it
+DEVIATION_THRESHOLDS = [0.2, 0.2, 0.2, 0.15, 0.1]
+DEVIATION_PENALTY_SCALES = [1.0, 1.0, 1.0, 1.5, 2.0]
+# Weight of the standard deviation of the deviations (penalizes uneven distributions)
+BALANCE_PENALTY = 0.5
+
+
+def line_weights(weights, size):
+    """Weight of every line in line table order, from a weights dict like MagicCube.weights."""
+    return np.repeat([weights['rows'], weights['columns'], weights['pillars'],
+                      weights['level_diagonals'], weights['space_diagonals']],
+                     list(line_group_sizes(size).values()))
+
+
+def weighted_cost(deviations, size, weights):
+    """
+    Weighted cost of the line deviations from the magic number: one cube (a vector of deviations)
+    or a batch (one row per cube). Shared by MagicCube.calculate_cost and batch_costs.
+    """
+    counts = list(line_group_sizes(size).values())
+    thresholds = np.repeat(DEVIATION_THRESHOLDS, counts) * magic_number(size)
+    penalties = np.repeat(DEVIATION_PENALTY_SCALES, counts) * weights['deviation_penalty']
+
+    cost = deviations @ line_weights(weights, size)
+    cost += (deviations * (deviations > thresholds)) @ penalties
+    cost += np.std(deviations, axis=-1) * BALANCE_PENALTY
+    return cost
+
+
+class MagicCube:
+    def __init__(self, cube_data=None, size=5, rng=None, strategy='random'):
+        self.size = size
+        if cube_data is not None:
+            self.cube = np.array(cube_data).reshape((size, size, size))
+        else:
+            # Starting cube from the seeding strategy (random permutation by default),
+            # drawn from the given generator (fresh entropy if none)
+            self.cube = initial_cube(strategy, size, rng)
+        
+        self.magic_number = self.calculate_magic_number()
+        # Flat cell indices of every line, precomputed once per size
+        self.lines = line_table(size)
+        
+        # Define weights for different types of sums
+        self.weights = {
+            'rows': 1.0,          # Basic weight for rows
+            'columns': 1.0,       # Basic weight for columns
+            'pillars': 1.2,       # Slightly higher weight for pillars (vertical lines)
+            'level_diagonals': 1.5,  # Higher weight for diagonals within each level
+            'space_diagonals': 2.0,  # Highest weight for space diagonals
+            'deviation_penalty': 0.1  # Additional penalty for large deviations
+        }
+
+    def calculate_magic_number(self):
+        """
+        Calculate the magic number for a magic cube.
+        Formula: size * (size^3 + 1) // 2
+        """
+        return (self.size * (self.size**3 + 1)) // 2
+
+    def _line_sums(self):
+        """Sum of every line, using the precomputed line table of this size."""
+        return self.cube.ravel()[self.lines].sum(axis=1)
+
+    def line_weights(self):
+        """Weight of every line in line table order, from self.weights."""
+        return line_weights(self.weights, self.size)
+
+    def calculate_cost(self):
+        """
+        Enhanced objective function that calculates the weighted total cost based on the deviations 
+        from the magic number. Different weights are applied to different types of sums, and additional
+        penalties are added for large deviations.
+        """
+        # Per-line weight, then the extra penalty for large deviations: more than 20% of the
+        # magic number for rows, columns and pillars, 15% for level diagonals (x1.5)
+        # and 10% for space diagonals (x2), plus a balance penalty for uneven deviations
+        deviations = np.abs(self._line_sums() - self.magic_number)
+        return float(weighted_cost(deviations, self.size, self.weights))
+
+    def calculate_actual_cost(self):
+        """
+        Calculates the actual number of constraint violations (unweighted).
+        This is useful for tracking actual progress.
+        """
+        return int((self._line_sums() != self.magic_number).sum())
+
+    def display(self):
+        """
+        Displays the current cube configuration.
+        """
+        print("Cube:")
+        print(self.cube)
+
+    def display_cost(self):
+        """
+        Displays both the weighted cost and actual constraint violations.
+        """
+        weighted_cost = self.calculate_cost()
+        actual_violations = self.calculate_actual_cost()
+        print(f"Weighted Cost: {weighted_cost}")
+        print(f"Actual Constraint Violations: {actual_violations}")
+
+
+def batch_costs(cubes, size=5, weights=None):
+    """
+    Weighted cost (as MagicCube.calculate_cost) and violation count (as calculate_actual_cost)
+    of a batch of cubes in one vectorized call. cubes is anything that reshapes to (-1, size^3);
+    weights defaults to MagicCube's weights. Returns (costs, violations) arrays.
+    """
+    if weights is None:
+        weights = MagicCube(cube_data=np.arange(1, size**3 + 1), size=size).weights
+    target = magic_number(size)
+    sums = line_sums(cubes, size)
+    return weighted_cost(np.abs(sums - target), size, weights), (sums != target).sum(axis=1)
@@ -0,0 +1,71 @@
+import itertools
+import numpy as np
+
+from lines import line_table, magic_number
+
+# Largest size whose full 2-swap neighborhood is still scanned by default (7750 pairs at n=5)
+MAX_FULL_NEIGHBORHOOD_SIZE = 5
+# Pairs evaluated per iteration by the bounded neighborhoods when no sample_size is given
+DEFAULT_SAMPLE_SIZE = 4000
+
+
+def _pairs(first, second, shape):
+    """(pos1, pos2) tuples of plain ints from two arrays of flat indices."""
+    positions1 = zip(*(axis.tolist() for axis in np.unravel_index(first, shape)))
+    positions2 = zip(*(axis.tolist() for axis in np.unravel_index(second, shape)))
+    return zip(positions1, positions2)
+
+
+def full_neighborhood(cube, rng=None, sample_size=None):
+    """Every pair of positions, generated lazily: O(n^6) pairs but O(1) memory."""
+    return itertools.combinations(np.ndindex(cube.cube.shape), 2)
+
+
+def sampled_neighborhood(cube, rng, sample_size=DEFAULT_SAMPLE_SIZE):
+    """sample_size uniformly random pairs of distinct positions."""
+    cells = cube.size**3
+    first = rng.integers(0, cells, sample_size)
+    second = rng.integers(0, cells - 1, sample_size)
+    second += second >= first
+    return _pairs(first, second, cube.cube.shape)
+
+
+def candidate_neighborhood(cube, rng, sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Candidate list: pairs between a cell of an above-magic line and a cell of a below-magic line,
+    taken from the most deviating lines. Falls back to uniform samples once every line is magic.
+    """
+    table = line_table(cube.size)
+    deviations = cube.cube.ravel()[table].sum(axis=1) - magic_number(cube.size)
+    order = np.argsort(-np.abs(deviations))
+    # Enough lines that both sides together offer roughly sample_size distinct pairs
+    num_lines = max(2, int(np.sqrt(sample_size) / cube.size) + 1)
+    high = np.unique(table[[line for line in order[:4 * num_lines] if deviations[line] > 0][:num_lines]])
+    low = np.unique(table[[line for line in order[:4 * num_lines] if deviations[line] < 0][:num_lines]])
+    if len(high) == 0 or len(low) == 0:
+        return sampled_neighborhood(cube, rng, sample_size)
+
+    first = rng.choice(high, sample_size)
+    second = rng.choice(low, sample_size)
+    keep = first != second
+    return _pairs(first[keep], second[keep], cube.cube.shape)
+
+
+NEIGHBORHOODS = {
+    'full': full_neighborhood,
+    'sampled': sampled_neighborhood,
+    'candidates': candidate_neighborhood
+}
+
+
+def neighborhood(name, cube, rng, sample_size=None):
+    """
+    Iterator over the (pos1, pos2) swaps to evaluate in one iteration.
+    'auto' scans the full neighborhood up to MAX_FULL_NEIGHBORHOOD_SIZE and uses the
+    candidate list above it, so memory and time per iteration stay bounded for large sizes.
+    """
+    if name == 'auto':
+        name = 'full' if cube.size <= MAX_FULL_NEIGHBORHOOD_SIZE else 'candidates'
+    if name not in NEIGHBORHOODS:
+        raise ValueError(f"Unknown neighborhood '{name}', expected one of {['auto'] + list(NEIGHBORHOODS)}")
+    return NEIGHBORHOODS[name](cube, rng, sample_size if sample_size is not None else DEFAULT_SAMPLE_SIZE)
@@ -0,0 +1,111 @@
+import numpy as np
+
+from lines import line_table, cell_lines
+
+# Objective every run is reported on, so results stay comparable across objectives
+CANONICAL_OBJECTIVE = 'weighted'
+
+
+class ExactObjective:
+    """
+    The canonical weighted cost (MagicCube.calculate_cost) or the violation count
+    (calculate_actual_cost), behind the same interface as the surrogates.
+    Deltas cost a full evaluation.
+    """
+
+    def __init__(self, cube, actual=False):
+        self.cube = cube
+        # Swaps go through a flat view of the cube
+        cube.cube = np.ascontiguousarray(cube.cube)
+        self.evaluate = cube.calculate_actual_cost if actual else cube.calculate_cost
+        self.value = self.evaluate()
+
+    def swap_delta(self, index1, index2):
+        flat = self.cube.cube.reshape(-1)
+        flat[index1], flat[index2] = flat[index2], flat[index1]
+        new_value = self.evaluate()
+        flat[index1], flat[index2] = flat[index2], flat[index1]
+        return new_value - self.value
+
+    def apply_swap(self, index1, index2):
+        flat = self.cube.cube.reshape(-1)
+        flat[index1], flat[index2] = flat[index2], flat[index1]
+        self.value = self.evaluate()
+
+    def sync(self):
+        self.value = self.evaluate()
+        return self.value
+
+
+class LineDeviationObjective:
+    """
+    Separable surrogate: sum over lines of weight * |deviation|^power, with the same per-line
+    weights as calculate_cost but without its threshold and balance penalties.
+
+    Line sums are kept up to date, and through the line incidence a swap only touches the
+    (at most 14) lines through its two cells, so swap_delta and apply_swap are O(1).
+    A value of 0 means every line is magic, exactly like the canonical cost.
+    """
+
+    def __init__(self, cube, power=1):
+        self.cube = cube
+        cube.cube = np.ascontiguousarray(cube.cube)
+        self.power = power
+        self.weights = cube.line_weights().tolist()
+        self.incidence = cell_lines(cube.size)
+        self.sync()
+
+    def _term(self, line, deviation):
+        return self.weights[line] * (abs(deviation) if self.power == 1 else deviation * deviation)
+
+    def sync(self):
+        """Recompute the line sums from the cube, e.g. after the cube was changed directly."""
+        flat = self.cube.cube.reshape(-1)
+        self.deviations = (flat[line_table(self.cube.size)].sum(axis=1) - self.cube.magic_number).tolist()
+        self.value = sum(self._term(line, deviation) for line, deviation in enumerate(self.deviations))
+        return self.value
+
+    def _line_changes(self, index1, index2):
+        flat = self.cube.cube.reshape(-1)
+        difference = int(flat[index2]) - int(flat[index1])
+        changes = {}
+        for line in self.incidence[index1]:
+            changes[line] = difference
+        for line in self.incidence[index2]:
+            changes[line] = changes.get(line, 0) - difference
+        return changes
+
+    def swap_delta(self, index1, index2):
+        delta = 0
+        for line, change in self._line_changes(index1, index2).items():
+            if change:
+                deviation = self.deviations[line]
+                delta += self._term(line, deviation + change) - self._term(line, deviation)
+        return delta
+
+    def apply_swap(self, index1, index2):
+        for line, change in self._line_changes(index1, index2).items():
+            if change:
+                deviation = self.deviations[line]
+                self.value += self._term(line, deviation + change) - self._term(line, deviation)
+                self.deviations[line] = deviation + change
+        flat = self.cube.cube.reshape(-1)
+        flat[index1], flat[index2] = flat[index2], flat[index1]
+
+
+OBJECTIVES = {
+    'weighted': lambda cube: ExactObjective(cube),
+    'violations': lambda cube: ExactObjective(cube, actual=True),
+    'l1': lambda cube: LineDeviationObjective(cube, power=1),
+    'l2': lambda cube: LineDeviationObjective(cube, power=2)
+}
+
+
+def make_objective(name, cube):
+    """
+    Objective a search drives on. Runs are still reported on the canonical weighted cost,
+    surrogates ('l1', 'l2') only decide which moves are worth an exact evaluation.
+    """
+    if name not in OBJECTIVES:
+        raise ValueError(f"Unknown objective '{name}', expected one of {list(OBJECTIVES)}")
+    return OBJECTIVES[name](cube)
@@ -0,0 +1,78 @@
+import math
+import numpy as np
+from collections import deque
+
+
+class OperatorScheduler:
+    """
+    Multi-armed bandit that decides which move operator (arm) gets the next evaluation.
+
+    - policy='ucb': UCB1 on the mean reward, exploration controls the confidence bonus.
+    - policy='thompson': Beta posterior per arm, rewards are treated as success probabilities.
+
+    Rewards are in [0, 1], typically 1 when an evaluation of the operator improved the cost,
+    so arms are ranked by improvement per evaluation. With decay < 1 old observations fade
+    out, letting the schedule follow operators whose usefulness changes during a run.
+    """
+
+    def __init__(self, operators, policy='ucb', exploration=1.0, decay=1.0, rng=None):
+        if policy not in ('ucb', 'thompson'):
+            raise ValueError(f"Unknown scheduler policy '{policy}', expected 'ucb' or 'thompson'")
+        self.operators = list(operators)
+        self.policy = policy
+        self.exploration = exploration
+        self.decay = decay
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.pulls = {operator: 0.0 for operator in self.operators}
+        self.rewards = {operator: 0.0 for operator in self.operators}
+        self.total_pulls = 0.0
+
+    def select(self, available=None):
+        """Operator for the next evaluation, among `available` operators if given."""
+        candidates = self.operators if available is None else [op for op in self.operators if op in available]
+        if self.policy == 'thompson':
+            scores = {op: self.rng.beta(self.rewards[op] + 1, self.pulls[op] - self.rewards[op] + 1) for op in candidates}
+            return max(candidates, key=scores.__getitem__)
+
+        # UCB1: every operator is tried once before the confidence bonus applies
+        for op in candidates:
+            if self.pulls[op] == 0:
+                return op
+        log_total = math.log(max(self.total_pulls, 1))
+        return max(candidates, key=lambda op: self.rewards[op] / self.pulls[op]
+                   + self.exploration * math.sqrt(2 * log_total / self.pulls[op]))
+
+    def update(self, operator, reward):
+        """Record the reward of one evaluation of operator."""
+        if self.decay < 1.0:
+            for op in self.operators:
+                self.pulls[op] *= self.decay
+                self.rewards[op] *= self.decay
+            self.total_pulls *= self.decay
+        self.pulls[operator] += 1
+        self.rewards[operator] += float(reward)
+        self.total_pulls += 1
+
+    def order(self, candidates_by_operator):
+        """
+        Interleave per-operator candidate lists into one evaluation order, choosing the operator
+        of every slot with select(). The caller reports outcomes with update() as it evaluates.
+        """
+        queues = {op: deque(candidates) for op, candidates in candidates_by_operator.items() if candidates}
+        while queues:
+            op = self.select(available=queues)
+            yield op, queues[op].popleft()
+            if not queues[op]:
+                del queues[op]
+
+    def stats(self):
+        """Pulls and mean reward per operator."""
+        return {op: {'pulls': self.pulls[op], 'mean_reward': self.rewards[op] / self.pulls[op] if self.pulls[op] else None}
+                for op in self.operators}
+
+
+def make_scheduler(scheduler, operators, rng=None):
+    """Accepts None, a policy name ('ucb', 'thompson') or a ready OperatorScheduler."""
+    if scheduler is None or isinstance(scheduler, OperatorScheduler):
+        return scheduler
+    return OperatorScheduler(operators, policy=scheduler, rng=rng)
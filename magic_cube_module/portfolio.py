@@ -0,0 +1,297 @@
+import os
+import math
+import time
+import queue
+import contextlib
+import multiprocessing
+import numpy as np
+
+from magic_cube import MagicCube
+from algorithms.stochastichc import stochastic_hill_climbing
+from algorithms.simulatedannealing import simulated_annealing
+from algorithms.sidewaysmovehc import hill_climbing_with_sideways_move
+from algorithms.randomrestarthc import random_restart_hill_climbing
+from algorithms.genetic import genetic_algorithm
+from random_streams import spawn_seeds
+from shared_state import BestBoard, SharedPopulation, share_line_table, install_line_table
+
+# Members raced by default: the algorithms that can run for a given number of iterations
+DEFAULT_PORTFOLIO = [
+    {'name': 'stochastic', 'algorithm': 'stochastic', 'params': {'objective': 'l1'}},
+    {'name': 'simulated_annealing', 'algorithm': 'simulated_annealing', 'params': {'temperature_schedule': 'calibrated'}},
+    {'name': 'sideways_move', 'algorithm': 'sideways_move', 'params': {}},
+    {'name': 'ils', 'algorithm': 'random_restart', 'params': {'mode': 'ils', 'perturbation': 'kick'}},
+    {'name': 'steady_state_ga', 'algorithm': 'genetic', 'params': {'mode': 'steady_state', 'population_size': 20}}
+]
+
+
+def _stochastic(cube, iterations, seed, params):
+    cost, final_cube, _, _ = stochastic_hill_climbing(cube, max_iterations=iterations, seed=seed, **params)
+    return cost, final_cube
+
+
+def _simulated_annealing(cube, iterations, seed, params):
+    result = simulated_annealing(cube, max_iterations=iterations, seed=seed, **params)
+    return result[0], result[1]
+
+
+def _sideways_move(cube, iterations, seed, params):
+    params = dict(params)
+    max_sideways_moves = params.pop('max_sideways_moves', 10)
+    cost, final_cube, _, _ = hill_climbing_with_sideways_move(cube, max_sideways_moves, iterations, seed=seed, **params)
+    return cost, final_cube
+
+
+def _random_restart(cube, iterations, seed, params):
+    params = dict(params)
+    # The iteration budget is split into restarts of max_iterations_per_restart each
+    per_restart = params.pop('max_iterations_per_restart', 50)
+    cost, final_cube, _, _, _ = random_restart_hill_climbing(cube, max(1, iterations // per_restart), per_restart,
+                                                             seed=seed, **params)
+    return cost, final_cube
+
+
+def _genetic(cube, iterations, seed, params):
+    # The GA breeds its own population (continued across rungs through params['shared_population']),
+    # the member's best cube is kept by the portfolio
+    params = dict(params)
+    result = genetic_algorithm(params.pop('population_size', 20), iterations, 0.1, True, seed=seed, size=cube.size, **params)
+    return result['final_cost'], np.array(result['final_cube']).reshape((cube.size,) * 3)
+
+
+RUNNERS = {
+    'stochastic': _stochastic,
+    'simulated_annealing': _simulated_annealing,
+    'sideways_move': _sideways_move,
+    'random_restart': _random_restart,
+    'genetic': _genetic
+}
+
+
+# Shared state of a worker process, set once by the pool initializer
+_worker_board = None
+_worker_populations = {}
+
+
+# Iterations of the first slice of a rung, run to measure how many iterations a member does per CPU second
+PROBE_ITERATIONS = 20
+
+
+def _init_worker(line_table, board, populations, size):
+    global _worker_board, _worker_populations
+    install_line_table(line_table, size)
+    _worker_board = board
+    _worker_populations = populations
+
+
+def run_member(algorithm, slot, size, cpu_time, seed, params):
+    """
+    One rung of a portfolio member, executed in a worker process: continue from the member's best
+    cube (its slot of the shared BestBoard) for `cpu_time` CPU seconds and offer the results back.
+    The algorithms only take an iteration count, so the rung starts with a short probe slice that
+    measures the member's speed and then runs slices sized to use up the rest of its CPU time, each
+    continuing from the member's best cube.
+    A GA member continues the population of its previous rung, kept in its SharedPopulation.
+    Only the best cost, the CPU seconds spent and the iterations run travel back through the pool,
+    the algorithm's progress output and its steps stay in the worker.
+    """
+    start_cpu = time.process_time()
+    if slot in _worker_populations:
+        params = {**params, 'shared_population': _worker_populations[slot]}
+    sequence = np.random.SeedSequence(seed)
+    best_cost = math.inf
+    iterations = 0
+    slice_iterations = PROBE_ITERATIONS
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        while True:
+            start_cube, _ = _worker_board.read(slot)
+            cube = MagicCube(cube_data=start_cube, size=size)
+            # The first slice runs with the rung's seed, later ones with seeds drawn from it
+            slice_seed = seed if iterations == 0 else int(sequence.spawn(1)[0].generate_state(1)[0])
+            cost, final_cube = RUNNERS[algorithm](cube, slice_iterations, slice_seed, params)
+            _worker_board.offer(slot, final_cube, cost)
+            best_cost = min(best_cost, cost)
+            iterations += slice_iterations
+            used = time.process_time() - start_cpu
+            if used >= cpu_time or best_cost == 0:
+                break
+            slice_iterations = max(1, math.ceil(iterations / used * (cpu_time - used))) if used > 0 else slice_iterations * 2
+    return float(best_cost), used, iterations
+
+
+class Portfolio:
+    """
+    Races several algorithms and configurations on a process pool under one global budget.
+
+    Members run in rungs (successive halving): every surviving member continues from its own best
+    cube for the rung's CPU time, then the members are ranked by their best cost, only the best
+    1/eta survive and the next rung gets eta times the CPU time. The budget freed by the eliminated
+    members goes to the leaders. The race ends when time_budget wall-clock seconds or cpu_budget
+    CPU seconds (summed over members) are used up, or, with stop_on_solution, as soon as any member
+    finds a magic cube, in which case the workers still running are killed.
+
+    Rungs are budgeted in CPU seconds rather than iterations because an iteration is each
+    algorithm's own unit and their costs differ widely (one cost evaluation for stochastic hill
+    climbing, a scan of the candidate swaps for sideways move, a whole generation for a
+    generational GA), so members are compared after the same amount of work. A member's cpu_time
+    is the CPU time its workers spent in the algorithm, without time queued in the pool; its
+    iterations are reported for information only.
+
+    The line table, the members' best cubes and the GA members' populations live in shared memory
+    (shared_state), so the pool only carries small control messages: what to run next and the
+    resulting cost.
+    """
+
+    def __init__(self, members=None, size=5, time_budget=None, cpu_budget=None, initial_cpu_time=1.0,
+                 eta=2, processes=None, stop_on_solution=True, seed=None):
+        self.members = [dict(member) for member in (members if members is not None else DEFAULT_PORTFOLIO)]
+        for member in self.members:
+            if member['algorithm'] not in RUNNERS:
+                raise ValueError(f"Unknown algorithm '{member['algorithm']}', expected one of {list(RUNNERS)}")
+        if time_budget is None and cpu_budget is None:
+            raise ValueError("A portfolio needs a time_budget or a cpu_budget")
+        self.size = size
+        self.time_budget = time_budget
+        self.cpu_budget = cpu_budget
+        self.initial_cpu_time = initial_cpu_time
+        self.eta = eta
+        self.processes = processes if processes is not None else os.cpu_count()
+        self.stop_on_solution = stop_on_solution
+        self.seed = seed
+
+    def run(self, initial_cube=None):
+        """
+        Race the members, all starting from initial_cube (a fresh random cube if None).
+        Returns a dict with best_cost, best_cube, winner, solved, duration, cpu_time, iterations
+        and per-member statistics under 'members'.
+        """
+        start_time = time.time()
+        if initial_cube is None:
+            initial_cube = MagicCube(size=self.size, rng=np.random.default_rng(self.seed)).cube
+        # Every member draws the seeds of its rungs from its own sequence
+        sequences = [np.random.SeedSequence(seed) for seed in spawn_seeds(self.seed, len(self.members))]
+        stats = {
+            member['name']: {
+                'algorithm': member['algorithm'],
+                'best_cost': MagicCube(cube_data=initial_cube, size=self.size).calculate_cost(),
+                'best_cube': None,
+                'iterations': 0,
+                'rungs': 0,
+                'cpu_time': 0.0,        # CPU seconds spent in the workers
+                'history': [],          # Best cost after every rung
+                'eliminated_at': None,  # Rung in which the member was dropped
+                'error': None
+            }
+            for member in self.members
+        }
+
+        survivors = list(range(len(self.members)))
+        rung_time = self.initial_cpu_time
+        spent = 0.0
+        iterations = 0
+        rung = 0
+        solved_by = None
+        timed_out = False
+
+        # Every member's slot starts from the initial cube; the workers keep their slots up to date
+        board = BestBoard(len(self.members), self.size)
+        for slot in range(len(self.members)):
+            board.offer(slot, initial_cube, stats[self.members[slot]['name']]['best_cost'])
+        line_table = share_line_table(self.size)
+        populations = {
+            slot: SharedPopulation(member.get('params', {}).get('population_size', 20), self.size)
+            for slot, member in enumerate(self.members) if member['algorithm'] == 'genetic'
+        }
+
+        # Results are pushed by the pool's callbacks, so the race can stop on the first solution
+        results = queue.Queue()
+        pool = multiprocessing.Pool(min(self.processes, len(self.members)), initializer=_init_worker,
+                                    initargs=(line_table, board, populations, self.size))
+        try:
+            while survivors and solved_by is None and not timed_out:
+                if self.cpu_budget is not None:
+                    rung_time = min(rung_time, (self.cpu_budget - spent) / len(survivors))
+                    if rung_time <= 0:
+                        break
+
+                for index in survivors:
+                    member = self.members[index]
+                    member_stats = stats[member['name']]
+                    seed = int(sequences[index].spawn(1)[0].generate_state(1)[0])
+                    pool.apply_async(run_member,
+                                     (member['algorithm'], index, self.size, rung_time, seed, member.get('params', {})),
+                                     callback=lambda result, index=index: results.put((index, result, None)),
+                                     error_callback=lambda error, index=index: results.put((index, None, error)))
+
+                pending = len(survivors)
+                while pending:
+                    timeout = None if self.time_budget is None else self.time_budget - (time.time() - start_time)
+                    try:
+                        index, result, error = results.get(timeout=max(timeout, 0) if timeout is not None else None)
+                    except queue.Empty:
+                        timed_out = True
+                        break
+                    pending -= 1
+                    member_stats = stats[self.members[index]['name']]
+                    if error is not None:
+                        member_stats['error'] = repr(error)
+                        member_stats['eliminated_at'] = rung
+                        survivors.remove(index)
+                        continue
+                    result, cpu_time, member_iterations = result
+                    member_stats['cpu_time'] += cpu_time
+                    member_stats['iterations'] += member_iterations
+                    member_stats['rungs'] += 1
+                    member_stats['best_cost'] = min(member_stats['best_cost'], result)
+                    member_stats['history'].append(member_stats['best_cost'])
+                    spent += cpu_time
+                    iterations += member_iterations
+                    if member_stats['best_cost'] == 0 and solved_by is None:
+                        solved_by = self.members[index]['name']
+                        if self.stop_on_solution:
+                            break
+
+                if solved_by is not None or timed_out:
+                    break
+
+                # Successive halving: keep the best 1/eta, give the survivors eta times the CPU time
+                survivors.sort(key=lambda index: stats[self.members[index]['name']]['best_cost'])
+                keep = max(1, math.ceil(len(survivors) / self.eta))
+                for index in survivors[keep:]:
+                    stats[self.members[index]['name']]['eliminated_at'] = rung
+                survivors = survivors[:keep]
+                rung_time *= self.eta
+                rung += 1
+        finally:
+            # Kills members still running when the race is decided or out of time
+            pool.terminate()
+            pool.join()
+            for slot, member in enumerate(self.members):
+                stats[member['name']]['best_cube'], stats[member['name']]['best_cost'] = board.read(slot)
+            board.unlink()
+            line_table.unlink()
+            for population in populations.values():
+                population.unlink()
+
+        winner = solved_by if solved_by is not None else min(stats, key=lambda name: stats[name]['best_cost'])
+        return {
+            'best_cost': stats[winner]['best_cost'],
+            'best_cube': stats[winner]['best_cube'],
+            'winner': winner,
+            'solved': stats[winner]['best_cost'] == 0,
+            'duration': time.time() - start_time,
+            'cpu_time': spent,
+            'iterations': iterations,
+            'rungs': max(member['rungs'] for member in stats.values()),
+            'members': stats
+        }
+
+
+def member_table(result):
+    """Per-member statistics of a portfolio run as report rows."""
+    return [
+        {'Member': name, 'Algorithm': member['algorithm'], 'Best Cost': member['best_cost'], 'Iterations': member['iterations'],
+         'Rungs': member['rungs'], 'CPU Time (s)': round(member['cpu_time'], 2),
+         'Eliminated At Rung': member['eliminated_at'] if member['eliminated_at'] is not None else '', 'Error': member['error'] or ''}
+        for name, member in result['members'].items()
+    ]
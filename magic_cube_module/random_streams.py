@@ -0,0 +1,84 @@
+import numpy as np
+
+# Draws buffered per refill, large enough to amortize the numpy call overhead
+DEFAULT_BLOCK_SIZE = 4096
+
+
+def make_rng(seed=None):
+    """Per-run generator; seed may be an int, a SeedSequence or None for fresh entropy."""
+    return np.random.default_rng(seed)
+
+
+def spawn_rngs(seed, count):
+    """Independent, reproducible generators for parallel workers derived from one seed."""
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(count)]
+
+
+def spawn_seeds(seed, count):
+    """Like spawn_rngs but returns plain integer seeds, convenient to pass to worker processes."""
+    return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(count)]
+
+
+class BlockSampler:
+    """
+    Serves the random draws of a search from blocks pre-drawn with one numpy call each,
+    instead of one Python-level random call per coordinate.
+
+    Each kind of draw (swap pairs, single positions, uniforms) has its own block, refilled
+    from the run's generator when exhausted, so the sequence only depends on the seed and
+    the order of calls.
+    """
+
+    def __init__(self, rng, size, block_size=DEFAULT_BLOCK_SIZE):
+        self.rng = rng
+        self.size = size
+        self.cells = size**3
+        self.block_size = block_size
+        # Flat index -> (level, row, col)
+        self.coords = [tuple(int(v) for v in np.unravel_index(i, (size, size, size))) for i in range(self.cells)]
+        self._swaps = []
+        self._swap_pos = 0
+        self._positions = []
+        self._position_pos = 0
+        self._uniforms = []
+        self._uniform_pos = 0
+
+    def swap_indices(self):
+        """Two distinct flat cell indices."""
+        if self._swap_pos == len(self._swaps):
+            first = self.rng.integers(0, self.cells, self.block_size)
+            # Draw the second from the remaining cells so no rejection loop is needed
+            second = self.rng.integers(0, self.cells - 1, self.block_size)
+            second += second >= first
+            self._swaps = list(zip(first.tolist(), second.tolist()))
+            self._swap_pos = 0
+        pair = self._swaps[self._swap_pos]
+        self._swap_pos += 1
+        return pair
+
+    def swap(self):
+        """Two distinct (level, row, col) positions."""
+        index1, index2 = self.swap_indices()
+        return self.coords[index1], self.coords[index2]
+
+    def position(self):
+        """A single random (level, row, col) position."""
+        if self._position_pos == len(self._positions):
+            self._positions = self.rng.integers(0, self.cells, self.block_size).tolist()
+            self._position_pos = 0
+        index = self._positions[self._position_pos]
+        self._position_pos += 1
+        return self.coords[index]
+
+    def uniform(self):
+        """A uniform float in [0, 1)."""
+        if self._uniform_pos == len(self._uniforms):
+            self._uniforms = self.rng.random(self.block_size).tolist()
+            self._uniform_pos = 0
+        value = self._uniforms[self._uniform_pos]
+        self._uniform_pos += 1
+        return value
+
+    def integer(self, low, high):
+        """A uniform integer in [low, high), taken from the uniform block."""
+        return low + int(self.uniform() * (high - low))
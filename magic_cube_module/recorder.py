@@ -0,0 +1,172 @@
+import os
+import glob
+import numpy as np
+
+from results import flat_index
+
+# Columns recorded for local search steps and for genetic algorithm generations
+STEP_FIELDS = {
+    'index1': np.int16,
+    'index2': np.int16,
+    'cost': np.float32,
+    'exp_value': np.float32,
+    'accepted': np.int8
+}
+# Value used when a step dict does not carry a field (floats default to NaN)
+FIELD_DEFAULTS = {
+    'accepted': 1
+}
+GENERATION_FIELDS = {
+    'max_objective': np.float64,
+    'avg_objective': np.float64
+}
+
+
+class TrajectoryRecorder:
+    """
+    Drop-in replacement for the in-memory `steps` list of the algorithms.
+
+    Steps are buffered in fixed-size numpy chunks. Full chunks are written to `directory`
+    (one .npz file per chunk) so memory stays flat and a crashed run can still be loaded
+    with load_trajectory. Without a directory the chunks are kept in memory in compact form.
+
+    Optional modes:
+    - downsample_every: keep every k-th step in memory for plotting.
+    - ring_size: keep only the last N steps in memory, for monitoring. Such a trajectory does not
+      start from the initial cube, so it cannot be stored in a RunRecord (or exported).
+    """
+
+    def __init__(self, directory=None, chunk_size=10000, downsample_every=None, ring_size=None,
+                 fields=STEP_FIELDS, shape=(5, 5, 5)):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.downsample_every = downsample_every
+        self.ring_size = ring_size
+        self.fields = dict(fields)
+        self.shape = shape
+
+        self.count = 0          # Total number of steps recorded
+        self.chunks_written = 0
+        self._buffer = self._empty(chunk_size)
+        self._pos = 0
+        self._chunks = []       # In-memory chunks when there is no directory and no ring
+        self._ring = self._empty(0)
+        self._downsampled = []
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def _empty(self, length):
+        return {name: np.zeros(length, dtype=dtype) for name, dtype in self.fields.items()}
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, step):
+        """Record one step given as a dict (like the old step dicts) or a tuple in field order."""
+        pos = self._pos
+        if isinstance(step, dict):
+            for name, column in self._buffer.items():
+                value = step.get(name, FIELD_DEFAULTS.get(name, np.nan if np.issubdtype(column.dtype, np.floating) else 0))
+                if name.startswith('index'):
+                    value = flat_index(value, self.shape)
+                column[pos] = value
+        else:
+            for column, value in zip(self._buffer.values(), step):
+                column[pos] = value
+
+        self._pos += 1
+        self.count += 1
+        if self._pos == self.chunk_size:
+            self.flush()
+
+    def extend(self, steps):
+        for step in steps:
+            self.append(step)
+
+    def flush(self):
+        """Move the buffered steps out of the chunk buffer (to disk, ring and downsampled copies)."""
+        if self._pos == 0:
+            return
+        chunk = {name: column[:self._pos].copy() for name, column in self._buffer.items()}
+        offset = self.count - self._pos
+
+        if self.directory is not None:
+            path = os.path.join(self.directory, f"chunk_{self.chunks_written:06d}.npz")
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.savez(f, offset=offset, **chunk)
+            os.replace(tmp_path, path)
+        elif self.ring_size is None:
+            self._chunks.append(chunk)
+
+        if self.ring_size is not None:
+            self._ring = {
+                name: np.concatenate([self._ring[name], chunk[name]])[-self.ring_size:]
+                for name in self.fields
+            }
+
+        if self.downsample_every:
+            # Keep the steps whose global index is a multiple of downsample_every
+            first = (-offset) % self.downsample_every
+            self._downsampled.append({name: chunk[name][first::self.downsample_every] for name in self.fields})
+
+        self.chunks_written += 1
+        self._pos = 0
+
+    def close(self):
+        self.flush()
+
+    def columns(self):
+        """
+        Steps currently held in memory as a dict of arrays: the last ring_size steps in ring mode,
+        everything without a directory, otherwise only the not yet flushed steps.
+        """
+        pending = {name: column[:self._pos] for name, column in self._buffer.items()}
+        if self.ring_size is not None:
+            return {name: np.concatenate([self._ring[name], pending[name]])[-self.ring_size:] for name in self.fields}
+        return {
+            name: np.concatenate([chunk[name] for chunk in self._chunks] + [pending[name]])
+            for name in self.fields
+        }
+
+    def trajectory(self):
+        """
+        The full recorded trajectory as a dict of arrays (read back from disk when needed).
+        In ring mode only the last ring_size steps exist.
+        """
+        self.flush()
+        if self.directory is not None and self.ring_size is None and self.chunks_written:
+            return load_trajectory(self.directory)
+        return self.columns()
+
+    def downsampled(self):
+        """Every downsample_every-th step as a dict of arrays, including the unflushed buffer."""
+        if not self.downsample_every:
+            return None
+        offset = self.count - self._pos
+        first = (-offset) % self.downsample_every
+        parts = self._downsampled + [{name: column[:self._pos][first::self.downsample_every]
+                                      for name, column in self._buffer.items()}]
+        return {name: np.concatenate([part[name] for part in parts]) for name in self.fields}
+
+
+def load_trajectory(directory):
+    """
+    Load all chunks written by a TrajectoryRecorder, including those of an interrupted run.
+    Returns a dict of arrays.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "chunk_*.npz")))
+    parts = []
+    for path in paths:
+        with np.load(path) as data:
+            parts.append({name: data[name] for name in data.files if name != 'offset'})
+    if not parts:
+        return {}
+    return {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
@@ -0,0 +1,238 @@
+import os
+import json
+import base64
+import hashlib
+import inspect
+import contextlib
+import numpy as np
+
+import magic_cube
+import objectives
+import endgame
+import operator_scheduler
+import random_streams
+from algorithms import stochastichc, simulatedannealing
+from algorithms.stochastichc import stochastic_hill_climbing
+from algorithms.simulatedannealing import simulated_annealing, draw_multi_swap_positions
+from random_streams import make_rng, BlockSampler
+from objectives import CANONICAL_OBJECTIVE
+
+# Algorithms whose whole trajectory is a function of the initial cube, the seed and the params
+REPLAYABLE = {
+    'stochastic': stochastic_hill_climbing,
+    'simulated_annealing': simulated_annealing
+}
+
+
+def code_version():
+    """
+    Short hash of the source of the replayable algorithms and the cost function they use.
+    A record can only be replayed by the same code that produced it.
+    """
+    source = "".join(inspect.getsource(module) for module in (stochastichc, simulatedannealing, random_streams, magic_cube, objectives, operator_scheduler, endgame))
+    return hashlib.sha1(source.encode()).hexdigest()[:12]
+
+
+class ReplayRecord:
+    """
+    Everything needed to regenerate a run: initial cube, seed, algorithm params and code version.
+    `accepted` optionally holds one bit per step so fast_forward can skip rejected moves.
+    """
+
+    def __init__(self, algorithm, initial_cube, seed, params, num_steps, version=None, accepted=None):
+        self.algorithm = algorithm
+        self.initial_cube = np.asarray(initial_cube).ravel().tolist()
+        self.seed = seed
+        self.params = params
+        self.num_steps = num_steps
+        self.version = version if version is not None else code_version()
+        self.accepted = accepted
+
+    @property
+    def size(self):
+        return round(len(self.initial_cube) ** (1 / 3))
+
+    def steps(self, cube_factory=magic_cube.MagicCube):
+        """The full step list of the run, regenerated with replay() without the run's progress output."""
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+            return replay(self, cube_factory)
+
+    def to_dict(self):
+        record = {
+            'algorithm': self.algorithm,
+            'initial_cube': self.initial_cube,
+            'seed': self.seed,
+            'params': self.params,
+            'num_steps': self.num_steps,
+            'version': self.version
+        }
+        if self.accepted is not None:
+            record['accepted'] = base64.b64encode(np.packbits(self.accepted).tobytes()).decode()
+        return record
+
+    @classmethod
+    def from_dict(cls, record):
+        accepted = None
+        if 'accepted' in record:
+            packed = np.frombuffer(base64.b64decode(record['accepted']), dtype=np.uint8)
+            accepted = np.unpackbits(packed)[:record['num_steps']].astype(bool)
+        return cls(record['algorithm'], record['initial_cube'], record['seed'], record['params'],
+                   record['num_steps'], record['version'], accepted)
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+
+class _AcceptanceTap:
+    """
+    Step sink that remembers which steps were accepted and forwards them to the real sink.
+    The flags are buffered in a fixed-size chunk and kept packed, one bit per step, once it fills.
+    """
+
+    def __init__(self, sink, chunk_size=8192):
+        self.sink = sink
+        self.chunk_size = chunk_size  # A multiple of 8 so every full chunk packs into whole bytes
+        self.count = 0
+        self._packed = []
+        self._buffer = np.zeros(chunk_size, dtype=bool)
+        self._pos = 0
+
+    def __len__(self):
+        return len(self.sink)
+
+    def append(self, step):
+        # Stochastic hill climbing marks rejected steps with a 0/0 placeholder swap
+        is_placeholder = step['index1'] == 0 and step['index2'] == 0
+        self._buffer[self._pos] = step.get('accepted', not is_placeholder)
+        self._pos += 1
+        self.count += 1
+        if self._pos == self.chunk_size:
+            self._packed.append(np.packbits(self._buffer))
+            self._pos = 0
+        self.sink.append(step)
+
+    def accepted(self):
+        """Boolean array of the accepted flag of every step."""
+        return np.concatenate([np.unpackbits(chunk).astype(bool) for chunk in self._packed] +
+                              [self._buffer[:self._pos].copy()])
+
+
+class _StopReplay(Exception):
+    pass
+
+
+class _SliceCollector:
+    """Step sink that keeps only steps[start:stop] and aborts the run once stop is reached."""
+
+    def __init__(self, start, stop):
+        self.start = start
+        self.stop = stop
+        self.count = 0
+        self.steps = []
+
+    def __len__(self):
+        return self.count
+
+    def append(self, step):
+        if self.count >= self.start:
+            self.steps.append(step)
+        self.count += 1
+        if self.stop is not None and self.count >= self.stop:
+            raise _StopReplay()
+
+
+def record_run(algorithm, cube, seed, recorder=None, checkpoint=None, **params):
+    """
+    Run a replayable algorithm with an explicit seed.
+    Returns the algorithm's usual result tuple and the ReplayRecord describing the run.
+    A checkpoint is passed through to algorithms that support one but is not part of the record.
+    """
+    initial_cube = cube.cube.copy()
+    tap = _AcceptanceTap(recorder if recorder is not None else [])
+    run_options = {'checkpoint': checkpoint} if checkpoint is not None else {}
+    result = REPLAYABLE[algorithm](cube, recorder=tap, seed=seed, **run_options, **params)
+
+    # A resumed run returns the tap restored from its checkpoint
+    steps_index = 3 if algorithm == 'stochastic' else 4
+    tap = result[steps_index]
+    result = result[:steps_index] + (tap.sink,) + result[steps_index + 1:]
+    record = ReplayRecord(algorithm, initial_cube, seed, params, tap.count, accepted=tap.accepted())
+    return result, record
+
+
+def _check_version(record):
+    if record.version != code_version():
+        raise ValueError(f"Record was produced by code version {record.version}, current version is {code_version()}")
+
+
+def replay(record, cube_factory, start=0, stop=None):
+    """
+    Regenerate steps[start:stop] of a recorded run by re-running the algorithm with the same seed.
+    cube_factory builds the cube object (e.g. MagicCube) from cube_data and size.
+    """
+    _check_version(record)
+    cube = cube_factory(cube_data=record.initial_cube, size=record.size)
+    collector = _SliceCollector(start, stop)
+    try:
+        REPLAYABLE[record.algorithm](cube, recorder=collector, seed=record.seed, **record.params)
+    except _StopReplay:
+        pass
+    return collector.steps
+
+
+def fast_forward(record, cube_factory, start=0, stop=None):
+    """
+    Regenerate steps[start:stop] from the seed and the accepted bits without evaluating rejected moves.
+    Only the RNG draws are repeated; the cost is computed once when entering the slice and after
+    every accepted swap inside it. Steps carry index1, index2 and cost (no exp_value).
+    """
+    _check_version(record)
+    if record.accepted is None:
+        raise ValueError("Record has no accepted bits, use replay instead")
+    if record.params.get('operator_scheduler') is not None or record.params.get('temperature_schedule', 'fixed') != 'fixed':
+        raise ValueError("Runs with an operator scheduler or a calibrated schedule make extra draws, use replay instead")
+    if record.params.get('objective', CANONICAL_OBJECTIVE) != CANONICAL_OBJECTIVE:
+        raise ValueError("Runs on a surrogate objective are not supported by fast_forward, use replay instead")
+    if record.params.get('endgame'):
+        raise ValueError("Endgame moves are not drawn from the seed, use replay instead")
+
+    cube = cube_factory(cube_data=record.initial_cube, size=record.size)
+    sampler = BlockSampler(make_rng(record.seed), record.size)
+    stop = record.num_steps if stop is None else min(stop, record.num_steps)
+    multi_swap_probability = record.params.get('multi_swap_probability', 0.3)
+    steps = []
+    current_cost = None
+
+    for iteration in range(stop):
+        pos1, pos2 = sampler.swap()
+        swapped = True
+        if record.algorithm == 'simulated_annealing':
+            # Keep the sampler in step with the multi-swap and acceptance draws
+            if sampler.uniform() < multi_swap_probability:
+                draw_multi_swap_positions(sampler)
+                swapped = False
+            sampler.uniform()
+
+        accepted = bool(record.accepted[iteration])
+        if accepted and swapped:
+            cube.cube[pos1], cube.cube[pos2] = cube.cube[pos2], cube.cube[pos1]
+
+        if iteration < start:
+            continue
+        if current_cost is None or (accepted and swapped):
+            current_cost = cube.calculate_cost()
+
+        if record.algorithm == 'stochastic' and not accepted:
+            steps.append({'index1': 0, 'index2': 0, 'cost': current_cost})
+        else:
+            steps.append({
+                'index1': int(np.ravel_multi_index(pos1, cube.cube.shape)),
+                'index2': int(np.ravel_multi_index(pos2, cube.cube.shape)),
+                'cost': current_cost
+            })
+
+    return steps
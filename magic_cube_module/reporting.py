@@ -0,0 +1,141 @@
+import os
+import io
+import html
+import time
+import queue
+import base64
+import threading
+import numpy as np
+import matplotlib
+
+# Headless backend: rendering never opens a window or blocks the experiment
+matplotlib.use("Agg")
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Roughly the horizontal resolution of a saved figure, more points are not visible
+DEFAULT_MAX_POINTS = 2000
+
+
+def decimate_minmax(values, max_points=DEFAULT_MAX_POINTS):
+    """
+    Reduce a series to at most max_points points while keeping its visual envelope:
+    the series is cut into max_points // 2 buckets and the min and max of every bucket are kept,
+    in the order they occur. Returns (x, y) arrays.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if n <= max_points:
+        return np.arange(n), values
+
+    num_buckets = max_points // 2
+    edges = np.linspace(0, n, num_buckets + 1).astype(int)
+    starts, ends = edges[:-1], edges[1:]
+    min_idx = np.array([start + np.argmin(values[start:end]) for start, end in zip(starts, ends)])
+    max_idx = np.array([start + np.argmax(values[start:end]) for start, end in zip(starts, ends)])
+    x = np.sort(np.unique(np.concatenate([min_idx, max_idx])))
+    return x, values[x]
+
+
+def render_series(title, series, xlabel, ylabel, yscale=None):
+    """PNG bytes of a line plot; series is a list of (label, x, y)."""
+    figure = Figure(figsize=(12, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    for label, x, y in series:
+        ax.plot(x, y, label=label)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    if yscale is not None:
+        ax.set_yscale(yscale)
+    if series:
+        ax.legend()
+    ax.grid(True)
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+class Report:
+    """
+    Consolidated report of a sweep, written as a single self-contained HTML file.
+
+    Series are decimated to screen resolution in the caller (so the full arrays can be
+    released right away) and rendered on a background worker thread, so adding a plot
+    never stalls a search. close() waits for the worker and writes the report.
+    """
+
+    def __init__(self, name, directory="reports", max_points=DEFAULT_MAX_POINTS):
+        self.name = name
+        self.directory = directory
+        self.max_points = max_points
+        self.sections = []
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            index, args = task
+            try:
+                self.sections[index]['png'] = render_series(*args)
+            except Exception as e:
+                # A broken plot should not take the rest of the report down
+                self.sections[index]['error'] = str(e)
+
+    def add_series_plot(self, title, series, xlabel='Iterations', ylabel='Objective Value', yscale=None):
+        """Queue a line plot; series maps a label to a sequence of y values."""
+        decimated = []
+        for label, values in series.items():
+            if values is not None and len(values):
+                x, y = decimate_minmax(values, self.max_points)
+                decimated.append((label, x, y))
+        self.sections.append({'kind': 'plot', 'title': title})
+        self._queue.put((len(self.sections) - 1, (title, decimated, xlabel, ylabel, yscale)))
+
+    def add_table(self, title, rows):
+        """Add a table from a list of dicts with the same keys."""
+        self.sections.append({'kind': 'table', 'title': title, 'rows': rows})
+
+    def _section_html(self, section):
+        parts = [f"<h2>{html.escape(section['title'])}</h2>"]
+        if section['kind'] == 'plot':
+            if 'png' in section:
+                encoded = base64.b64encode(section['png']).decode()
+                parts.append(f'<img src="data:image/png;base64,{encoded}">')
+            else:
+                parts.append(f"<p>Plot failed: {html.escape(section.get('error', 'not rendered'))}</p>")
+        elif section['rows']:
+            columns = list(section['rows'][0])
+            parts.append("<table><tr>" + "".join(f"<th>{html.escape(str(c))}</th>" for c in columns) + "</tr>")
+            for row in section['rows']:
+                parts.append("<tr>" + "".join(f"<td>{html.escape(str(row.get(c, '')))}</td>" for c in columns) + "</tr>")
+            parts.append("</table>")
+        return "\n".join(parts)
+
+    def close(self):
+        """Wait for pending plots and write the report. Returns the path of the HTML file."""
+        self._queue.put(None)
+        self._worker.join()
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.name}.html")
+        body = "\n".join(self._section_html(section) for section in self.sections)
+        document = (
+            f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(self.name)}</title>"
+            "<style>body{font-family:sans-serif;margin:2em}img{max-width:100%}"
+            "table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px}</style></head>\n"
+            f"<body><h1>{html.escape(self.name)}</h1><p>Generated {time.strftime('%Y-%m-%d %H:%M:%S')}</p>\n"
+            f"{body}\n</body></html>\n"
+        )
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(document)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,195 @@
+import numpy as np
+
+
+def flat_index(position, shape):
+    """Convert a step index (flat int or (level, row, col) tuple) to a flat cube index."""
+    if isinstance(position, tuple):
+        return int(np.ravel_multi_index(position, shape))
+    return int(position)
+
+
+def step_columns(steps, shape):
+    """
+    Columns of a step list or TrajectoryRecorder: index1, index2 (int16), cost (float32),
+    exp_value and accepted (None when the run does not record them).
+    """
+    # Steps written through a TrajectoryRecorder are already columnar
+    if hasattr(steps, 'trajectory'):
+        columns = steps.trajectory()
+        exp_value = columns['exp_value']
+        accepted = columns['accepted'].astype(bool)
+        return {
+            'index1': columns['index1'].astype(np.int16),
+            'index2': columns['index2'].astype(np.int16),
+            'cost': columns['cost'].astype(np.float32),
+            'exp_value': exp_value if len(exp_value) and not np.isnan(exp_value).all() else None,
+            'accepted': None if accepted.all() else accepted
+        }
+
+    count = len(steps)
+    columns = {
+        'index1': np.fromiter((flat_index(step['index1'], shape) for step in steps), dtype=np.int16, count=count),
+        'index2': np.fromiter((flat_index(step['index2'], shape) for step in steps), dtype=np.int16, count=count),
+        'cost': np.fromiter((step['cost'] for step in steps), dtype=np.float32, count=count),
+        'exp_value': None,
+        'accepted': None
+    }
+    # Only simulated annealing records the acceptance probability
+    if count > 0 and 'exp_value' in steps[0]:
+        columns['exp_value'] = np.fromiter((step['exp_value'] for step in steps), dtype=np.float32, count=count)
+    # Steps without an 'accepted' flag always applied their swap
+    if count > 0 and 'accepted' in steps[0]:
+        columns['accepted'] = np.fromiter((step['accepted'] for step in steps), dtype=bool, count=count)
+    return columns
+
+
+class RunRecord:
+    """
+    Struct-of-arrays record of a single run.
+    Cubes are stored as int16 arrays, swap indices as int16 and costs as float32 columns.
+    `steps` is either the list of step dicts returned by an algorithm or a TrajectoryRecorder.
+
+    Steps a TrajectoryRecorder wrote to disk stay in its chunk files, and a run of a seed-replayable
+    algorithm can keep its ReplayRecord (`replay`) instead of its steps. The columns of a recorder are
+    read back from disk each time they are accessed, so callers needing several columns should read
+    them all at once with columns(); the columns of a replay are regenerated from the seed once, on
+    first access, and kept on the record.
+
+    `segments` lists (first step, start cube) of every restart of a run whose trajectory does not
+    continue from a single cube; by default the whole trajectory starts from initial_cube.
+    """
+    __slots__ = ("initial_cost", "initial_cube", "final_cost", "final_cube", "duration",
+                 "iterations_per_restart", "replay", "segments", "_recorder", "_columns")
+
+    def __init__(self, initial_cost, initial_cube, final_cost, final_cube, duration, steps=None, iterations_per_restart=None,
+                 replay=None, segments=None):
+        shape = np.shape(initial_cube)
+        self.initial_cost = float(initial_cost)
+        self.initial_cube = np.asarray(initial_cube, dtype=np.int16).ravel()
+        self.final_cost = float(final_cost)
+        self.final_cube = np.asarray(final_cube, dtype=np.int16).ravel()
+        self.duration = float(duration)
+        self.iterations_per_restart = iterations_per_restart
+        self.replay = replay
+        self.segments = [(0, self.initial_cube)] if segments is None else \
+            [(int(start), np.asarray(cube, dtype=np.int16).ravel()) for start, cube in segments]
+
+        if len(shape) != 3:
+            size = round(len(self.initial_cube) ** (1 / 3))
+            shape = (size, size, size)
+        self._recorder = None
+        self._columns = None
+        if replay is not None:
+            return
+        if getattr(steps, 'ring_size', None) is not None:
+            # The window's first step does not start from initial_cube, so its swaps cannot be replayed
+            raise ValueError("a ring-mode TrajectoryRecorder only keeps the last steps of a run and cannot be stored")
+        if getattr(steps, 'directory', None) is not None:
+            # Everything recorded is (after a flush) on disk, keep only the recorder
+            steps.flush()
+            self._recorder = steps
+        else:
+            self._columns = step_columns(steps, shape)
+
+    def columns(self):
+        """Dict of the step columns: index1, index2, cost, exp_value and accepted (the last two may be None)."""
+        if self._columns is not None:
+            return self._columns
+        size = round(len(self.initial_cube) ** (1 / 3))
+        if self._recorder is not None:
+            return step_columns(self._recorder, (size, size, size))
+        # Replaying the search is far more expensive than keeping its columns
+        self._columns = step_columns(self.replay.steps(), (size, size, size))
+        return self._columns
+
+    @property
+    def index1(self):
+        return self.columns()['index1']
+
+    @property
+    def index2(self):
+        return self.columns()['index2']
+
+    @property
+    def cost(self):
+        return self.columns()['cost']
+
+    @property
+    def exp_value(self):
+        return self.columns()['exp_value']
+
+    @property
+    def accepted(self):
+        return self.columns()['accepted']
+
+    def step_dicts(self):
+        """Rebuild the step list in the original {'index1', 'index2', 'cost'} shape for export."""
+        columns = self.columns()
+        steps = [
+            {'index1': i1, 'index2': i2, 'cost': c}
+            for i1, i2, c in zip(columns['index1'].tolist(), columns['index2'].tolist(), columns['cost'].tolist())
+        ]
+        if columns['exp_value'] is not None:
+            for step, exp_value in zip(steps, columns['exp_value'].tolist()):
+                step['exp_value'] = exp_value
+        if columns['accepted'] is not None:
+            for step, accepted in zip(steps, columns['accepted'].tolist()):
+                step['accepted'] = accepted
+        return steps
+
+    def applied_mask(self, columns=None):
+        """Boolean array telling which recorded swaps were applied to the cube."""
+        columns = columns if columns is not None else self.columns()
+        if columns['accepted'] is None:
+            return np.ones(len(columns['cost']), dtype=bool)
+        return columns['accepted']
+
+
+class SearchResults:
+    """
+    Columnar storage for all runs of one algorithm.
+    The list-of-lists attributes used by the export are only built when accessed.
+    """
+
+    def __init__(self):
+        self.runs = []
+        self.stuck_count = 0
+
+    def add_run(self, initial_cost, initial_cube, final_cost, final_cube, iterations, duration, steps, iterations_per_restart=None,
+                replay=None, segments=None):
+        """Add a run; with a ReplayRecord the steps are not kept, the run is regenerated from it when read."""
+        self.runs.append(RunRecord(initial_cost, initial_cube, final_cost, final_cube, duration,
+                                   steps if replay is None else None, iterations_per_restart, replay, segments))
+
+    @property
+    def initial_cost(self):
+        return [run.initial_cost for run in self.runs]
+
+    @property
+    def initial_cube(self):
+        return [run.initial_cube.tolist() for run in self.runs]
+
+    @property
+    def final_cost(self):
+        return [run.final_cost for run in self.runs]
+
+    @property
+    def final_cube(self):
+        return [run.final_cube.tolist() for run in self.runs]
+
+    @property
+    def duration(self):
+        return [run.duration for run in self.runs]
+
+    @property
+    def replays(self):
+        """ReplayRecord of every run of a seed-replayable algorithm."""
+        return [run.replay for run in self.runs if run.replay is not None]
+
+    @property
+    def steps(self):
+        return [run.step_dicts() for run in self.runs]
+
+    @property
+    def iterations_per_restart(self):
+        return [run.iterations_per_restart for run in self.runs if run.iterations_per_restart is not None]
@@ -0,0 +1,166 @@
+import itertools
+import numpy as np
+from functools import lru_cache
+
+from lines import line_table, line_sums, magic_number
+from solutions import symmetry_permutations
+
+# Cap on coefficient combinations tried by the constructive search when no shortcut exists
+MAX_CONSTRUCTIVE_CANDIDATES = 50000
+
+
+def _linear_cube(coefficients, size):
+    """
+    Cube whose value at (i, j, k) is size^2 * a + size * b + c + 1, where a, b, c are
+    linear forms of (i, j, k) mod size given by the rows of `coefficients`.
+    """
+    i, j, k = np.indices((size, size, size))
+    digits = [(row[0] * i + row[1] * j + row[2] * k) % size for row in coefficients]
+    return size**2 * digits[0] + size * digits[1] + digits[2] + 1
+
+
+def _is_invertible(coefficients, size):
+    return np.gcd(int(round(np.linalg.det(np.array(coefficients)))) % size, size) == 1
+
+
+@lru_cache(maxsize=None)
+def linear_construction(size):
+    """
+    Best modular (Latin-cube) construction for an odd size, as a flat array.
+
+    When every linear form is a unit mod size along a line, that line takes each digit once
+    and hits the magic number. Forms that are units along every checked direction are tried
+    first, otherwise combinations of forms are scored by the number of magic lines.
+    Returns None for even sizes, where no such forms exist.
+    """
+    if size % 2 == 0:
+        return None
+
+    directions = [(1, 0, 0), (0, 1, 0), (0, 0, 1), (0, 1, 1), (0, 1, -1),
+                  (1, 1, 1), (1, 1, -1), (1, -1, 1), (1, -1, -1)]
+    forms = [form for form in itertools.product(range(size), repeat=3)
+             if all(np.gcd(value, size) == 1 for value in form)]
+    perfect_forms = [form for form in forms
+                     if all(np.gcd(np.dot(form, d) % size, size) == 1 for d in directions)]
+
+    magic = magic_number(size)
+    best_cube, best_score = None, -1
+    for candidates in (perfect_forms, forms):
+        for coefficients in itertools.islice(itertools.combinations(candidates, 3), MAX_CONSTRUCTIVE_CANDIDATES):
+            if not _is_invertible(coefficients, size):
+                continue
+            cube = _linear_cube(coefficients, size).ravel()
+            score = int((line_sums(cube, size)[0] == magic).sum())
+            if score > best_score:
+                best_cube, best_score = cube, score
+            if best_score == len(line_table(size)):
+                return best_cube
+        if best_cube is not None and candidates is perfect_forms:
+            return best_cube
+    return best_cube
+
+
+def random_cube(size, rng):
+    return rng.permutation(np.arange(1, size**3 + 1))
+
+
+def constructive_cube(size, rng):
+    """
+    Near-magic cube from the modular construction, randomized with a line-preserving
+    symmetry and the complement map so repeated seeds differ. Falls back to greedy for even sizes.
+    """
+    base = linear_construction(size)
+    if base is None:
+        return greedy_cube(size, rng)
+    perms = symmetry_permutations(size)
+    cube = base[perms[rng.integers(len(perms))]]
+    if rng.random() < 0.5:
+        cube = size**3 + 1 - cube
+    return cube
+
+
+def greedy_cube(size, rng):
+    """
+    Line-balanced greedy placement: numbers are placed from largest to smallest, each into the
+    empty cell whose lines have the largest remaining need per empty cell. Ties are broken randomly.
+    """
+    table = line_table(size)
+    cells = size**3
+    incidence = np.zeros((cells, len(table)))
+    incidence[table, np.arange(len(table))[:, None]] = 1.0
+
+    need = np.full(len(table), float(magic_number(size)))
+    empty_in_line = np.full(len(table), float(size))
+    cube = np.zeros(cells, dtype=int)
+    empty = np.ones(cells, dtype=bool)
+    jitter = rng.random(cells) * 1e-6
+
+    for value in range(cells, 0, -1):
+        scores = incidence @ (need / np.maximum(empty_in_line, 1)) + jitter
+        scores[~empty] = -np.inf
+        cell = int(np.argmax(scores))
+        cube[cell] = value
+        empty[cell] = False
+        lines = incidence[cell] > 0
+        need[lines] -= value
+        empty_in_line[lines] -= 1
+    return cube
+
+
+def perturbed_cube(base, size, rng, num_swaps=None):
+    """A previous best cube with num_swaps random swaps applied (default: about 5% of the cells)."""
+    cube = np.asarray(base).ravel().copy()
+    if num_swaps is None:
+        num_swaps = max(1, size**3 // 20)
+    for _ in range(num_swaps):
+        a, b = rng.choice(size**3, 2, replace=False)
+        cube[a], cube[b] = cube[b], cube[a]
+    return cube
+
+
+def worst_line_kick(base, size, rng, num_swaps=None, num_lines=None):
+    """
+    Targeted perturbation: each swap moves a value out of one of the num_lines lines with the
+    largest deviation from the magic number into a random cell elsewhere in the cube.
+    """
+    cube = np.asarray(base).ravel().copy()
+    if num_swaps is None:
+        num_swaps = max(1, size**3 // 20)
+    if num_lines is None:
+        num_lines = max(1, num_swaps)
+    deviations = np.abs(line_sums(cube, size)[0] - magic_number(size))
+    worst = np.argsort(deviations)[::-1][:num_lines]
+    cells = np.unique(line_table(size)[worst])
+    for _ in range(num_swaps):
+        a = rng.choice(cells)
+        b = rng.integers(size**3 - 1)
+        b += b >= a
+        cube[a], cube[b] = cube[b], cube[a]
+    return cube
+
+
+STRATEGIES = {
+    'random': random_cube,
+    'constructive': constructive_cube,
+    'greedy': greedy_cube
+}
+
+
+def initial_cube(strategy='random', size=5, rng=None, base=None, num_swaps=None):
+    """
+    Starting cube of shape (size, size, size) for the given strategy:
+    'random', 'constructive', 'greedy', or 'perturb' / 'kick' (both need `base`, e.g. a previous best cube).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if strategy in ('perturb', 'kick'):
+        if base is None:
+            raise ValueError(f"The '{strategy}' strategy needs a base cube")
+        if strategy == 'perturb':
+            cube = perturbed_cube(base, size, rng, num_swaps)
+        else:
+            cube = worst_line_kick(base, size, rng, num_swaps)
+    elif strategy in STRATEGIES:
+        cube = STRATEGIES[strategy](size, rng)
+    else:
+        raise ValueError(f"Unknown seeding strategy '{strategy}', expected one of {list(STRATEGIES) + ['perturb', 'kick']}")
+    return np.asarray(cube).reshape((size, size, size))
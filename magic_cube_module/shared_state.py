@@ -0,0 +1,154 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+import lines
+
+
+class SharedArray:
+    """
+    NumPy array backed by a multiprocessing.shared_memory block.
+
+    Pickling a SharedArray only sends its handle (block name, shape and dtype), and unpickling it
+    in another process maps the same block, so passing one to a worker copies no data: both sides
+    read and write the same memory through .array. The creating process owns the block and
+    releases it with unlink().
+    """
+
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(self.shape)) * self.dtype.itemsize))
+        else:
+            # Workers started by the owner share its resource tracker, so attaching does not
+            # make them responsible for the block; only the owner unlinks it
+            self._memory = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self._memory.buf)
+
+    @classmethod
+    def from_array(cls, data):
+        data = np.asarray(data)
+        shared = cls(data.shape, data.dtype)
+        shared.array[...] = data
+        return shared
+
+    @property
+    def name(self):
+        return self._memory.name
+
+    def __getstate__(self):
+        return {'name': self.name, 'shape': self.shape, 'dtype': self.dtype.str}
+
+    def __setstate__(self, state):
+        self.__init__(state['shape'], state['dtype'], name=state['name'])
+
+    def close(self):
+        # Views into the block must be gone before the mapping can be closed
+        self.array = None
+        self._memory.close()
+
+    def unlink(self):
+        """Close and free the block (owner only)."""
+        self.close()
+        if self.owner:
+            self._memory.unlink()
+
+
+def share_line_table(size):
+    """The line table of a size in shared memory, for install_line_table in the workers."""
+    return SharedArray.from_array(lines.line_table(size))
+
+
+def install_line_table(shared, size):
+    """
+    Make lines.line_table(size) return the shared table in this process, so workers use the
+    parent's table instead of building (and holding) their own copy.
+    """
+    table = shared.array.view()
+    table.setflags(write=False)
+    lines.install_line_table(size, table)
+
+
+class SharedPopulation:
+    """
+    A GA population in shared memory: one flat cube per row and its cost in a fitness vector.
+    Other processes can follow or seed a running GA through the views without any pickling.
+    """
+
+    def __init__(self, population_size, size=5):
+        self.size = size
+        self.cubes = SharedArray((population_size, size**3), np.int32)
+        self.costs = SharedArray((population_size,), np.float64)
+        self.costs.array[:] = np.inf
+
+    def write(self, index, cube, cost):
+        self.cubes.array[index] = np.asarray(cube).ravel()
+        self.costs.array[index] = cost
+
+    def cube(self, index):
+        """(size, size, size) view of an individual."""
+        return self.cubes.array[index].reshape((self.size,) * 3)
+
+    def best(self):
+        index = int(np.argmin(self.costs.array))
+        return self.cube(index).copy(), float(self.costs.array[index])
+
+    def unlink(self):
+        self.cubes.unlink()
+        self.costs.unlink()
+
+
+class BestBoard:
+    """
+    Best-so-far cube of every worker slot in shared memory.
+
+    Every slot has a single writer (the worker it was handed to), so no lock is needed. Each slot
+    is double-buffered: a new best is written to the inactive buffer, which is then made active,
+    and a per-slot version number tells readers to retry when a write overlapped their copy.
+    A writer killed halfway through a write leaves the active buffer intact.
+    """
+
+    def __init__(self, slots, size=5):
+        self.size = size
+        self.cubes = SharedArray((slots, 2, size**3), np.int32)
+        self.costs = SharedArray((slots, 2), np.float64)
+        self.active = SharedArray((slots,), np.int64)
+        self.version = SharedArray((slots,), np.int64)
+        self.costs.array[:] = np.inf
+        self.active.array[:] = 0
+        self.version.array[:] = 0
+
+    def cost(self, slot):
+        return float(self.costs.array[slot, self.active.array[slot]])
+
+    def offer(self, slot, cube, cost):
+        """Store cube in slot if it beats the slot's best. Returns True if it was stored."""
+        if cost >= self.cost(slot):
+            return False
+        inactive = 1 - self.active.array[slot]
+        self.cubes.array[slot, inactive] = np.asarray(cube).ravel()
+        self.costs.array[slot, inactive] = cost
+        self.active.array[slot] = inactive
+        self.version.array[slot] += 1
+        return True
+
+    def read(self, slot):
+        """Consistent (cube, cost) copy of a slot."""
+        while True:
+            before = self.version.array[slot]
+            buffer = self.active.array[slot]
+            cube = self.cubes.array[slot, buffer].copy()
+            cost = float(self.costs.array[slot, buffer])
+            if self.version.array[slot] == before:
+                return cube.reshape((self.size,) * 3), cost
+
+    def best(self):
+        """Slot, cube and cost of the best slot."""
+        slot = min(range(len(self.active.array)), key=self.cost)
+        cube, cost = self.read(slot)
+        return slot, cube, cost
+
+    def unlink(self):
+        for shared in (self.cubes, self.costs, self.active, self.version):
+            shared.unlink()
@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import itertools
+import numpy as np
+from functools import lru_cache
+
+from lines import line_table, count_violations
+
+
+@lru_cache(maxsize=None)
+def symmetry_permutations(size):
+    """
+    Flat index maps of the rotations/reflections of the cube that keep the checked line set intact.
+    A transformed cube is obtained with flat_cube[perm].
+
+    Of the 48 axis permutations and flips only those mapping every checked line onto another
+    checked line are kept. Since calculate_cost only looks at diagonals inside the levels,
+    transforms that move the level axis are dropped.
+    """
+    idx = np.arange(size**3).reshape((size, size, size))
+    lines = {frozenset(line.tolist()) for line in line_table(size)}
+    perms = []
+
+    for axes in itertools.permutations(range(3)):
+        for flips in itertools.product((False, True), repeat=3):
+            transformed = np.transpose(idx, axes)
+            for axis, flip in enumerate(flips):
+                if flip:
+                    transformed = np.flip(transformed, axis=axis)
+            perm = transformed.ravel()
+
+            # A cell at old position perm[j] moves to new position j
+            inverse = np.empty_like(perm)
+            inverse[perm] = np.arange(size**3)
+            if all(frozenset(inverse[list(line)].tolist()) in lines for line in lines):
+                perms.append(perm)
+
+    table = np.array(perms)
+    table.setflags(write=False)
+    return table
+
+
+def canonical_form(cube, size):
+    """
+    Lexicographically smallest image of the cube under the line-preserving symmetries
+    and the complement map v -> size^3 + 1 - v.
+    """
+    flat = np.asarray(cube).reshape(size**3)
+    images = flat[symmetry_permutations(size)]
+    images = np.concatenate([images, size**3 + 1 - images])
+
+    # Narrow down the candidates one position at a time
+    candidates = np.arange(len(images))
+    for col in range(size**3):
+        values = images[candidates, col]
+        candidates = candidates[values == values.min()]
+        if len(candidates) == 1:
+            break
+    return images[candidates[0]]
+
+
+def canonical_hash(cube, size):
+    """Stable hash of the canonical form, used as the key of the solution index."""
+    canonical = canonical_form(cube, size).astype(np.int32)
+    return hashlib.sha1(canonical.tobytes()).hexdigest()
+
+
+def verify(cube, size):
+    """
+    Checks that the cube is a permutation of 1..size^3 and that every line hits the magic number.
+    """
+    flat = np.asarray(cube).reshape(size**3)
+    if not np.array_equal(np.sort(flat), np.arange(1, size**3 + 1)):
+        return False
+    return int(count_violations(flat, size)[0]) == 0
+
+
+class SolutionIndex:
+    """
+    On-disk registry of verified solutions keyed by their canonical hash.
+    Solutions found by different runs that are equal up to symmetry share one entry,
+    and known solutions are not verified again.
+    """
+
+    def __init__(self, path="solutions_index.json"):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def add(self, cube, size, source=None):
+        """
+        Register a cube if it is a valid solution.
+        Returns (hash, is_new); hash is None when the cube is not a solution.
+        """
+        key = canonical_hash(cube, size)
+        if key in self.entries:
+            if source is not None and source not in self.entries[key]["sources"]:
+                self.entries[key]["sources"].append(source)
+                self.save()
+            return key, False
+
+        if not verify(cube, size):
+            return None, False
+
+        self.entries[key] = {
+            "size": size,
+            "cube": canonical_form(cube, size).tolist(),
+            "sources": [source] if source is not None else []
+        }
+        self.save()
+        return key, True
+
+    def save(self):
+        # Write to a temporary file first so a crash never leaves a truncated index
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,48 @@
+import pytest
+
+from checkpoint import Checkpointer
+from algorithms.genetic import genetic_algorithm
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingCheckpointer(Checkpointer):
+    """Checkpointer that stops the run right after its second save."""
+
+    def save(self, state):
+        super().save(state)
+        if self.saves == 2:
+            raise Crash()
+
+
+@pytest.mark.parametrize("mode", ["generational", "steady_state"])
+def test_baldwinian_ga_resumes_like_an_uninterrupted_run(mode, tmp_path):
+    params = dict(population_size=10, max_iterations=40, mutation_rate=0.1, elitism=True, seed=3, mode=mode,
+                  memetic={'lamarckian': False, 'evaluations_per_individual': 30})
+    full = genetic_algorithm(**params)
+
+    path = str(tmp_path / "ga.ckpt")
+    with pytest.raises(Crash):
+        genetic_algorithm(checkpoint=CrashingCheckpointer(path, interval=10), **params)
+    resumed = genetic_algorithm(checkpoint=Checkpointer(path, interval=10, resume=True), **params)
+
+    assert resumed['final_cost'] == full['final_cost']
+    assert list(resumed['objective_per_iteration']) == list(full['objective_per_iteration'])
+
+
+@pytest.mark.parametrize("mode", ["generational", "steady_state"])
+def test_ga_with_a_mutation_scheduler_resumes_like_an_uninterrupted_run(mode, tmp_path):
+    params = dict(population_size=10, max_iterations=40, mutation_rate=0.1, elitism=True, seed=4, mode=mode,
+                  mutation_scheduler='ucb')
+    full = genetic_algorithm(**params)
+
+    path = str(tmp_path / "ga.ckpt")
+    with pytest.raises(Crash):
+        genetic_algorithm(checkpoint=CrashingCheckpointer(path, interval=10), **params)
+    resumed = genetic_algorithm(checkpoint=Checkpointer(path, interval=10, resume=True), **params)
+
+    assert resumed['final_cost'] == full['final_cost']
+    assert list(resumed['objective_per_iteration']) == list(full['objective_per_iteration'])
+    assert resumed['mutation_operators'] == full['mutation_operators']
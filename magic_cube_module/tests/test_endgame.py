@@ -0,0 +1,34 @@
+import numpy as np
+
+from magic_cube import MagicCube
+from endgame import run_endgame
+from seeding import linear_construction
+
+
+def swapped(flat, *pairs):
+    flat = np.array(flat)
+    for i, j in pairs:
+        flat[i], flat[j] = flat[j], flat[i]
+    return flat
+
+
+def test_endgame_closes_a_near_magic_cube():
+    solved = linear_construction(5)
+    broken = swapped(solved, (0, 7))
+    cube = MagicCube(cube_data=broken.reshape((5, 5, 5)), size=5)
+    steps = []
+
+    outcome = run_endgame(cube, True, steps)
+    assert outcome['solved'] and outcome['cost'] == 0
+    assert cube.calculate_actual_cost() == 0
+    replayed = swapped(broken, *[(step['index1'], step['index2']) for step in steps])
+    assert np.array_equal(replayed, cube.cube.ravel())
+    assert steps[-1]['cost'] == 0
+
+
+def test_endgame_leaves_a_solved_cube_alone():
+    cube = MagicCube(cube_data=linear_construction(5).reshape((5, 5, 5)), size=5)
+    steps = []
+    outcome = run_endgame(cube, True, steps)
+    assert not outcome['attempted'] and outcome['cost'] is None
+    assert steps == []
@@ -0,0 +1,92 @@
+import os
+import re
+import numpy as np
+import pytest
+
+from magic_cube import MagicCube
+from replay import record_run
+from results import SearchResults, RunRecord
+from recorder import TrajectoryRecorder
+from export import EXPORT_VERSION, build_keyframes_and_line_sums, write_chunked_run, read_chunk
+from lines import line_table
+from algorithms.randomrestarthc import random_restart_hill_climbing
+
+
+def random_cube(seed, size=5):
+    return MagicCube(size=size, rng=np.random.default_rng(seed))
+
+
+def swapped(flat, *pairs):
+    flat = np.array(flat)
+    for i, j in pairs:
+        flat[i], flat[j] = flat[j], flat[i]
+    return flat
+
+
+def test_exported_line_sums_end_on_the_final_cube():
+    cube = random_cube(3)
+    initial_cost, initial_cube = cube.calculate_cost(), cube.cube.copy()
+    (final_cost, final_cube, iterations, steps), _ = record_run("stochastic", cube, seed=5, max_iterations=500)
+    results = SearchResults()
+    results.add_run(initial_cost, initial_cube, final_cost, final_cube, iterations, 0.0, steps)
+
+    keyframes, line_sums = build_keyframes_and_line_sums(results.runs[0], keyframe_interval=64)
+    assert len(keyframes) == -(-len(steps) // 64)
+    assert np.array_equal(keyframes[0], initial_cube.ravel())
+    assert np.array_equal(line_sums[-1], final_cube.ravel()[line_table(5)].sum(axis=1))
+
+
+def test_exported_line_sums_follow_restarts():
+    cube = random_cube(4)
+    initial_cost, initial_cube = cube.calculate_cost(), cube.cube.copy()
+    segments = []
+    final_cost, final_cube, iterations, steps, per_restart = random_restart_hill_climbing(
+        cube, 3, 10, seed=6, segments=segments)
+    results = SearchResults()
+    results.add_run(initial_cost, initial_cube, final_cost, final_cube, iterations, 0.0, steps, per_restart,
+                    segments=segments)
+
+    assert len(segments) == 3
+    _, line_sums = build_keyframes_and_line_sums(results.runs[0], keyframe_interval=8)
+    # The last step ends the last restart, which continued from its own start cube
+    last_start, last_cube = segments[-1]
+    flat = last_cube.ravel()
+    for step in steps[last_start:]:
+        flat = swapped(flat, (step['index1'], step['index2']))
+    assert np.array_equal(line_sums[-1], flat[line_table(5)].sum(axis=1))
+
+
+def test_line_sums_of_large_cubes_survive_the_export(tmp_path):
+    # The magic number of n = 15 is 25320, lines with large values sum past the int16 range
+    size = 15
+    rng = np.random.default_rng(0)
+    initial_cube = rng.permutation(np.arange(1, size**3 + 1))
+    steps = [{'index1': int(i), 'index2': int(j), 'cost': 0.0} for i, j in rng.integers(0, size**3, (20, 2))]
+    final_cube = swapped(initial_cube, *[(step['index1'], step['index2']) for step in steps])
+    results = SearchResults()
+    results.add_run(0.0, initial_cube, 0.0, final_cube, len(steps), 0.0, steps)
+
+    entry = write_chunked_run(results.runs[0], str(tmp_path), chunk_size=8, keyframe_interval=4)
+    last = entry["chunks"][-1]
+    chunk = read_chunk(str(tmp_path / last["file"]), last, size, entry["num_lines"])
+    expected = final_cube[line_table(size)].sum(axis=1)
+    assert expected.max() > np.iinfo(np.int16).max
+    assert np.array_equal(chunk["line_sums"][-1], expected)
+
+
+def test_ring_mode_runs_are_not_stored():
+    cube = random_cube(5)
+    recorder = TrajectoryRecorder(chunk_size=16, ring_size=32)
+    (final_cost, final_cube, iterations, steps), _ = record_run("stochastic", cube, seed=1, max_iterations=100,
+                                                                recorder=recorder)
+    with pytest.raises(ValueError):
+        RunRecord(0.0, cube.cube, final_cost, final_cube, 0.0, steps)
+
+
+def test_simulator_reads_the_exported_version():
+    loader = os.path.join(os.path.dirname(__file__), "..", "..", "magic-simulator", "app", "data", "trajectoryLoader.js")
+    if not os.path.exists(loader):
+        pytest.skip("magic-simulator is not checked out next to magic_cube_module")
+    with open(loader) as f:
+        version = re.search(r"const EXPORT_VERSION = (\d+);", f.read())
+    assert version is not None and int(version.group(1)) == EXPORT_VERSION
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from magic_cube import MagicCube
+from replay import ReplayRecord, record_run, replay, fast_forward, _AcceptanceTap
+from results import SearchResults
+
+
+def random_cube(seed, size=5):
+    return MagicCube(size=size, rng=np.random.default_rng(seed))
+
+
+@pytest.mark.parametrize("algorithm", ["stochastic", "simulated_annealing"])
+def test_replay_and_fast_forward_match_the_recorded_run(algorithm):
+    result, record = record_run(algorithm, random_cube(1), seed=7, max_iterations=400)
+    steps = result[3] if algorithm == "stochastic" else result[4]
+    record = ReplayRecord.from_json(record.to_json())
+
+    replayed = replay(record, MagicCube)
+    assert [step['cost'] for step in replayed] == [step['cost'] for step in steps]
+
+    forwarded = fast_forward(record, MagicCube, start=100, stop=300)
+    assert len(forwarded) == 200
+    shape = (5, 5, 5)
+    for step, original in zip(forwarded, steps[100:300]):
+        assert step['cost'] == pytest.approx(original['cost'])
+        if algorithm == "simulated_annealing":
+            assert step['index1'] == np.ravel_multi_index(original['index1'], shape)
+            assert step['index2'] == np.ravel_multi_index(original['index2'], shape)
+
+
+def test_replay_backed_run_has_the_recorded_columns():
+    cube = random_cube(2)
+    initial_cost, initial_cube = cube.calculate_cost(), cube.cube.copy()
+    (final_cost, final_cube, iterations, steps), record = record_run("stochastic", cube, seed=3, max_iterations=300)
+    stored, replayed = SearchResults(), SearchResults()
+    stored.add_run(initial_cost, initial_cube, final_cost, final_cube, iterations, 0.0, steps)
+    replayed.add_run(initial_cost, initial_cube, final_cost, final_cube, iterations, 0.0, steps, replay=record)
+
+    assert replayed.replays == [record]
+    for name, column in stored.runs[0].columns().items():
+        other = replayed.runs[0].columns()[name]
+        assert (column is None and other is None) or np.array_equal(column, other)
+    # The search is replayed once, not on every column access
+    assert replayed.runs[0].columns() is replayed.runs[0].columns()
+
+
+def test_acceptance_flags_are_packed_per_chunk():
+    flags = [bool(i % 3) for i in range(21)]
+    tap = _AcceptanceTap([], chunk_size=8)
+    for flag in flags:
+        tap.append({'index1': 1, 'index2': 2, 'cost': 0.0, 'accepted': flag})
+    assert len(tap._packed) == 2
+    assert tap.accepted().tolist() == flags
@@ -0,0 +1,41 @@
+import pickle
+import numpy as np
+
+from shared_state import SharedArray, SharedPopulation, BestBoard
+
+
+def test_shared_array_pickles_as_a_handle():
+    shared = SharedArray.from_array(np.arange(10))
+    try:
+        attached = pickle.loads(pickle.dumps(shared))
+        attached.array[3] = 42
+        assert shared.array[3] == 42
+        assert not attached.owner
+        attached.close()
+    finally:
+        shared.unlink()
+
+
+def test_best_board_keeps_the_best_cube_of_each_slot():
+    board = BestBoard(2, size=3)
+    try:
+        first, second = np.arange(27), np.arange(27)[::-1]
+        assert board.offer(0, first, 10.0)
+        assert not board.offer(0, second, 12.0)
+        assert board.offer(0, second, 5.0)
+        cube, cost = board.read(0)
+        assert cost == 5.0 and np.array_equal(cube.ravel(), second)
+        assert board.best()[0] == 0
+    finally:
+        board.unlink()
+
+
+def test_shared_population_best():
+    population = SharedPopulation(3, size=3)
+    try:
+        for index, cost in enumerate([8.0, 2.0, 5.0]):
+            population.write(index, np.full(27, index), cost)
+        cube, cost = population.best()
+        assert cost == 2.0 and (cube == 1).all()
+    finally:
+        population.unlink()